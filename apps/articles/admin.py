@@ -17,7 +17,7 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'category', 'status', 'created_at']
+    list_display = ['title', 'author', 'category', 'status', 'comments_count', 'created_at']
     list_filter = ['status', 'category', 'created_at']
     search_fields = ['title', 'content']
     prepopulated_fields = {'slug': ('title',)}
@@ -0,0 +1,111 @@
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from rest_framework.generics import GenericAPIView
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .popularity import record_view
+from .serializers import build_comment_tree
+from .views import ArticleViewSet, CategoryViewSet, CommentViewSet, TagViewSet
+
+
+class AsyncReadView(View):
+    """
+    Async GET endpoint reusing a DRF viewset for everything but the I/O.
+
+    The viewset authenticates the request, checks permissions and builds the
+    filtered queryset (filters, ordering, search) in a single sync_to_async
+    call, so the JSON shape and the filtering semantics are the viewset's.
+    Counting, reading and prefetching then go through the async ORM and the
+    serializers only see prefetched data. Responses are JSON only and skip
+    the response cache and the conditional GET of the sync endpoints.
+    """
+
+    viewset_class = None
+    # URL kwarg that selects the retrieve action when present
+    lookup_url_kwarg = 'slug'
+
+    async def get(self, request, *args, **kwargs):
+        action = 'retrieve' if self.lookup_url_kwarg in kwargs else 'list'
+        viewset = self.viewset_class(action_map={'get': action}, renderer_classes=[JSONRenderer])
+        viewset.args = args
+        viewset.kwargs = kwargs
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        viewset.headers = viewset.default_response_headers
+        try:
+            queryset = await sync_to_async(self.prepare)(viewset, drf_request)
+            if action == 'list':
+                response = await self.list(viewset, queryset)
+            else:
+                response = await self.retrieve(viewset, queryset)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(drf_request, response, *args, **kwargs)
+        return response.render()
+
+    def prepare(self, viewset, request):
+        """Authentication, permissions and filtering, the sync part of the request."""
+        viewset.format_kwarg = viewset.get_format_suffix(**viewset.kwargs)
+        viewset.initial(request, *viewset.args, **viewset.kwargs)
+        return viewset.filter_queryset(viewset.get_queryset())
+
+    async def list(self, viewset, queryset):
+        paginator = viewset.paginator
+        if paginator is None:
+            rows = [row async for row in queryset.aiterator(chunk_size=1000)]
+        else:
+            rows = await paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+        data = await self.serialize(viewset, rows, many=True)
+        if paginator is None:
+            return Response(data)
+        return paginator.get_paginated_response(data)
+
+    async def retrieve(self, viewset, queryset):
+        lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+        # The async twin of the get_object_or_404() of the sync viewsets, same message
+        instance = await aget_object_or_404(queryset, **{viewset.lookup_field: viewset.kwargs[lookup]})
+        viewset.check_object_permissions(viewset.request, instance)
+        return Response(await self.serialize(viewset, instance))
+
+    async def serialize(self, viewset, instance, many=False):
+        context = await self.get_serializer_context(viewset, instance)
+        serializer = viewset.get_serializer_class()(instance, many=many, context=context)
+        return serializer.data
+
+    async def get_serializer_context(self, viewset, instance):
+        # The viewset's own get_serializer_context() may query synchronously
+        return GenericAPIView.get_serializer_context(viewset)
+
+
+class AsyncArticleView(AsyncReadView):
+    viewset_class = ArticleViewSet
+
+    async def retrieve(self, viewset, queryset):
+        response = await super().retrieve(viewset, queryset)
+        record_view(response.data['id'])
+        return response
+
+
+class AsyncCategoryView(AsyncReadView):
+    viewset_class = CategoryViewSet
+
+
+class AsyncTagView(AsyncReadView):
+    viewset_class = TagViewSet
+
+
+class AsyncCommentView(AsyncReadView):
+    viewset_class = CommentViewSet
+    lookup_url_kwarg = 'pk'
+
+    async def get_serializer_context(self, viewset, instance):
+        context = await super().get_serializer_context(viewset, instance)
+        # Same single query for the whole thread as CommentViewSet
+        # thread_comments was resolved by get_queryset() in prepare()
+        comments = viewset.thread_comments.select_related('author', 'author__profile')
+        _, context['comment_children'] = build_comment_tree(
+            [comment async for comment in comments.aiterator()]
+        )
+        return context
@@ -0,0 +1,151 @@
+import hashlib
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.response import Response
+
+from apps.core.replicas import read_from_primary
+
+from .models import Article
+
+GENERATION_KEY = 'articles:generation'
+MODIFIED_KEY = 'articles:modified'
+HITS_KEY = 'articles:cache:hits'
+MISSES_KEY = 'articles:cache:misses'
+
+article_cache = caches['articles']
+ArticleRef = namedtuple('ArticleRef', ['id', 'status', 'author_id'])
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seeded from the clock so a generation evicted from the cache never
+        # restarts below a value that older entries were stored under.
+        initial = time.time_ns() // 1000
+        cache.add(GENERATION_KEY, initial, timeout=None)
+        generation = cache.get(GENERATION_KEY, initial)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached response at once by moving to a new generation."""
+    cache.set(MODIFIED_KEY, time.time(), timeout=None)
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        return get_generation()
+
+
+def get_last_modified():
+    """Timestamp of the last generation bump, now if it is not known (a new or evicted cache)."""
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, time.time(), timeout=None)
+        modified = cache.get(MODIFIED_KEY, time.time())
+    return modified
+
+
+def article_ref_key(slug):
+    return f'articles:ref:{slug}'
+
+
+def resolve_article(slug):
+    """
+    ArticleRef of the article at `slug`, None if there is none (misses are
+    not cached). Entries are dropped by the articles signals when the article
+    is saved (under its old slug too when renamed) or deleted, and expire
+    after the cache TIMEOUT otherwise.
+    """
+    key = article_ref_key(slug)
+    ref = article_cache.get(key)
+    if ref is None:
+        # From the primary, a lagging replica must not be cached
+        row = (
+            Article.objects.using(DEFAULT_DB_ALIAS).filter(slug=slug)
+            .values_list('id', 'status', 'author_id').first()
+        )
+        if row is None:
+            return None
+        ref = ArticleRef(*row)
+        article_cache.set(key, ref)
+    return ref
+
+
+def invalidate_article_ref(*slugs):
+    article_cache.delete_many([article_ref_key(slug) for slug in slugs if slug])
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'generation': get_generation(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def facets_cache_key(signature):
+    return f'articles:facets:{get_generation()}:{hashlib.md5(signature.encode()).hexdigest()}'
+
+
+def trending_cache_key(days):
+    return f'articles:trending:{get_generation()}:{days}'
+
+
+def response_cache_key(request):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'articles:response:{get_generation()}:{url}'
+
+
+class CachedResponseMixin:
+    """
+    Serve list/retrieve responses from the cache.
+
+    Entries are keyed by the current generation, which the signals bump on
+    every write, so stale entries are never read again and simply expire.
+    Only anonymous requests are cached unless `cache_authenticated` is set
+    (for endpoints whose output does not depend on the user).
+    """
+
+    cache_authenticated = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view_func, request, *args, **kwargs):
+        if request.user.is_authenticated and not self.cache_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        key = response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _count(MISSES_KEY)
+        # A response built from a lagging replica would outlive the lag
+        read_from_primary()
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,51 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_last_modified, response_cache_key
+
+
+def _make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for article list and retrieve.
+
+    The ETag is the response cache key (generation and URL) with the user
+    and the format, Last-Modified the time of the last generation bump. Any
+    write that can change a body (article, comment, tag, category, author,
+    profile) bumps the generation, so a matching If-None-Match or
+    If-Modified-Since is answered with a 304 without a query or serializing
+    anything.
+
+    The generation is per process with LocMemCache: both validators also
+    move every RESPONSE_CACHE_TIMEOUT seconds, so a worker that missed a
+    write cannot answer 304 for longer than it would serve a cached body.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, view_func, request, *args, **kwargs):
+        # Taken before the body is built: a write in between moves the
+        # generation on, so these validators can only be older than the body
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        window = int(time.time() // timeout)
+        etag = _make_etag(response_cache_key(request), request.user.pk, request.accepted_renderer.format, window)
+        last_modified = max(int(get_last_modified()), window * timeout)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,59 @@
+from itertools import islice
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.renderers import JSONRenderer
+
+from .fast_serializers import ArticleListRowSerializer, datetime_representation
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ArticleExportRowSerializer(ArticleListRowSerializer):
+    """The article list payload plus the content and updated_at."""
+
+    columns = (*ArticleListRowSerializer.columns, 'content', 'updated_at')
+
+    def serialize(self, rows):
+        data = super().serialize(rows)
+        for item, row in zip(data, rows):
+            item['content'] = row.content
+            item['updated_at'] = datetime_representation(row.updated_at)
+        return data
+
+
+def parse_updated_since(value):
+    """ISO 8601 date or datetime, naive values are in the current timezone. Raises ValueError."""
+    moment = parse_datetime(value)
+    if moment is None:
+        # A plain date means the start of that day
+        moment = parse_datetime(f'{value}T00:00:00')
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(queryset, updated_since=None):
+    """
+    Articles in export order. Rows come oldest change first, so a partner can
+    resume with `updated_since` set to the last `updated_at` it received.
+    """
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gt=updated_since)
+    return queryset.order_by('updated_at', 'pk')
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the articles as NDJSON, one chunk of lines at a time.
+
+    Rows are read through a server-side iterator and the tags of each chunk
+    come from a single query, so memory stays flat whatever the table size.
+    """
+    serializer = ArticleExportRowSerializer()
+    renderer = JSONRenderer()
+    rows = serializer.get_rows_queryset(queryset).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield b''.join(renderer.render(item) + b'\n' for item in serializer.serialize(chunk))
@@ -0,0 +1,187 @@
+"""
+Read-only serializers building plain dicts from values_list() rows.
+
+They produce exactly what ArticleListSerializer and CommentSerializer
+produce (`manage.py bench_serializers` checks it), without instantiating
+models or going through DRF field objects for every row. Datetimes still go
+through DRF's DateTimeField so formats and timezones cannot drift.
+"""
+
+from collections import defaultdict
+
+from django.db.models import F, OrderBy
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .models import Article, Tag
+
+_datetime_field = serializers.DateTimeField()
+
+
+def datetime_representation(value):
+    return None if value is None else _datetime_field.to_representation(value)
+
+
+def _user(author_id, username, first_name, last_name, avatar_url):
+    """UserMinimalSerializer output."""
+    return {
+        'id': author_id,
+        'username': username,
+        'first_name': first_name,
+        'last_name': last_name,
+        'avatar_url': avatar_url,
+    }
+
+
+USER_COLUMNS = (
+    'author_id', 'author__username', 'author__first_name', 'author__last_name',
+    'author__profile__avatar_url',
+)
+
+
+def ordering_fields(queryset):
+    """Names of the fields `queryset` is ordered by, extra selects excluded."""
+    names = []
+    for term in queryset.query.order_by or queryset.model._meta.ordering:
+        if isinstance(term, OrderBy):
+            term = term.expression
+        if isinstance(term, F):
+            name = term.name
+        elif isinstance(term, str):
+            name = term.lstrip('-')
+        else:
+            continue
+        if name != '?' and name not in queryset.query.extra and name not in names:
+            names.append(name)
+    return names
+
+
+class RowSerializer:
+    """Base class: `columns` is what the queryset is reduced to."""
+
+    columns = ()
+
+    def get_rows_queryset(self, queryset):
+        """
+        values_list() of `columns`, rows are named tuples so paginators can
+        read the sort key. The ordering fields missing from `columns` (the
+        comment path of the thread order) and the extra selects used for
+        ordering (search rank) are kept at the end of each row.
+        """
+        ordering = [name for name in ordering_fields(queryset) if name not in self.columns]
+        return queryset.prefetch_related(None).values_list(
+            *self.columns, *ordering, *queryset.query.extra, named=True
+        )
+
+    def serialize(self, rows):
+        raise NotImplementedError
+
+
+class ArticleListRowSerializer(RowSerializer):
+    """ArticleListSerializer output, with the tags of the page in one query."""
+
+    columns = (
+        'pk', 'title', 'slug', 'excerpt', 'image_url', *USER_COLUMNS,
+        'category_id', 'category__name', 'category__slug', 'category__description',
+        'status', 'created_at', 'published_at', 'comments_count',
+    )
+
+    def serialize(self, rows):
+        tags = self.get_tags([row[0] for row in rows])
+        data = []
+        for (
+            pk, title, slug, excerpt, image_url,
+            author_id, username, first_name, last_name, avatar_url,
+            category_id, category_name, category_slug, category_description,
+            status, created_at, published_at, comments_count, *_,
+        ) in rows:
+            data.append({
+                'id': pk,
+                'title': title,
+                'slug': slug,
+                'excerpt': excerpt,
+                'image_url': image_url,
+                'author': _user(author_id, username, first_name, last_name, avatar_url),
+                'category': None if category_id is None else {
+                    'id': category_id,
+                    'name': category_name,
+                    'slug': category_slug,
+                    'description': category_description,
+                },
+                'tags': tags.get(pk, []),
+                'status': status,
+                'created_at': datetime_representation(created_at),
+                'published_at': datetime_representation(published_at),
+                'comments_count': comments_count,
+            })
+        return data
+
+    def get_tags(self, article_ids):
+        """article id -> TagSerializer output, in the order prefetch_related('tags') gives."""
+        tags = defaultdict(list)
+        if not article_ids:
+            return tags
+        through = (
+            Article.tags.through.objects
+            .filter(article_id__in=article_ids)
+            .order_by(*(f'tag__{name}' for name in Tag._meta.ordering))
+            .values_list('article_id', 'tag_id', 'tag__name', 'tag__slug')
+        )
+        for article_id, tag_id, name, slug in through:
+            tags[article_id].append({'id': tag_id, 'name': name, 'slug': slug})
+        return tags
+
+
+class CommentRowSerializer(RowSerializer):
+    """
+    CommentSerializer output with nested replies, taken from `thread`: a
+    queryset of every comment of the article, read in one query.
+    """
+
+    columns = (
+        'pk', *USER_COLUMNS, 'content', 'parent_id', 'created_at', 'updated_at',
+    )
+
+    def __init__(self, thread=None):
+        self.children = defaultdict(list)
+        if thread is not None:
+            for row in self.get_rows_queryset(thread):
+                self.children[row.parent_id].append(row)
+
+    def serialize(self, rows):
+        data = []
+        for (
+            pk, author_id, username, first_name, last_name, avatar_url,
+            content, parent_id, created_at, updated_at, *_,
+        ) in rows:
+            data.append({
+                'id': pk,
+                'author': _user(author_id, username, first_name, last_name, avatar_url),
+                'content': content,
+                'parent': parent_id,
+                'created_at': datetime_representation(created_at),
+                'updated_at': datetime_representation(updated_at),
+                'replies': self.serialize(self.children.get(pk, ())),
+            })
+        return data
+
+
+class RowListMixin:
+    """
+    list() serialized by the viewset's row serializer instead of its DRF
+    serializer. Filtering, pagination and the response body are unchanged.
+    """
+
+    def get_row_serializer(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        filtered = self.filter_queryset(self.get_queryset())
+        # Pages are counted without the joins of the row columns
+        self.count_queryset = filtered
+        queryset = row_serializer.get_rows_queryset(filtered)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.serialize(page))
+        return Response(row_serializer.serialize(list(queryset)))
@@ -0,0 +1,151 @@
+"""
+Bulk article import, for content migrations.
+
+Articles arrive as a JSON array or as NDJSON, are validated as a whole
+(every error is reported, nothing is written if one article is invalid) and
+inserted with bulk_create: tags and categories are resolved by name in one
+query each, slugs are allocated for the whole import at once.
+"""
+
+import json
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from slugify import slugify
+
+from .cache import bump_generation
+from .models import Article, Category, Tag
+from .related import schedule_related_update
+
+IMPORT_BATCH_SIZE = 500
+# Per API request, larger migrations go through `manage.py import_articles`
+IMPORT_MAX_ARTICLES = 10_000
+
+
+def parse_ndjson(stream, encoding='utf-8'):
+    """One JSON object per non-empty line. Raises ValueError with the line number."""
+    items = []
+    for number, line in enumerate(stream, start=1):
+        if isinstance(line, bytes):
+            line = line.decode(encoding)
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as exc:
+            raise ValueError(f'line {number}: {exc}') from exc
+    return items
+
+
+class NDJSONParser(BaseParser):
+    """Parses `application/x-ndjson` bodies into a list."""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            return parse_ndjson(stream, encoding)
+        except ValueError as exc:
+            raise ParseError(f'NDJSON invalide, {exc}')
+
+
+class ArticleImportSerializer(serializers.ModelSerializer):
+    """One imported article, category and tags given by name."""
+
+    category = serializers.CharField(max_length=100, required=False, allow_null=True, allow_blank=True)
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=list)
+
+    class Meta:
+        model = Article
+        fields = [
+            'title', 'excerpt', 'content', 'image_url',
+            'category', 'tags', 'status', 'published_at',
+        ]
+
+    def validate_category(self, value):
+        if value and not slugify(value):
+            raise serializers.ValidationError('Nom de catégorie invalide.')
+        return value or None
+
+    def validate_tags(self, value):
+        for name in value:
+            if not slugify(name):
+                raise serializers.ValidationError(f'Nom de tag invalide : "{name}".')
+        # Keep the first occurrence of each tag
+        return list(dict.fromkeys(value))
+
+
+def validate_import(items, max_length=None):
+    """Validate every article, returns (validated data, errors by position)."""
+    serializer = ArticleImportSerializer(data=items, many=True, allow_empty=False, max_length=max_length)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, serializer.errors
+
+
+def resolve_by_name(model, names):
+    """
+    name -> instance for `names`, creating the missing ones. Existing rows are
+    matched on their name or on the slug the name would get, so "Bloc" and
+    "bloc" resolve to the same tag.
+    """
+    if not names:
+        return {}
+    names = list(dict.fromkeys(names))
+    slugs = {name: slugify(name) for name in names}
+    existing = model.objects.filter(
+        Q(name__in=names) | Q(slug__in=set(slugs.values()))
+    )
+    by_name = {}
+    by_slug = {}
+    for instance in existing:
+        by_name[instance.name] = instance
+        by_slug[instance.slug] = instance
+
+    missing = {}
+    for name in names:
+        if name not in by_name and slugs[name] not in by_slug:
+            missing.setdefault(slugs[name], model(name=name, slug=slugs[name]))
+    if missing:
+        for instance in model.objects.bulk_create(missing.values()):
+            by_slug[instance.slug] = instance
+    return {name: by_name.get(name) or by_slug[slugs[name]] for name in names}
+
+
+def import_articles(articles, author, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Insert validated articles for `author` in one transaction, returns the
+    created articles. Signals do not fire, the related articles (in the
+    background) and the response cache are updated once at the end.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        categories = resolve_by_name(Category, [data['category'] for data in articles if data.get('category')])
+        tags = resolve_by_name(Tag, [name for data in articles for name in data.get('tags', ())])
+        slugs = Article.objects.allocate_slugs([data['title'] for data in articles])
+        created = []
+        for data, slug in zip(articles, slugs):
+            fields = {key: value for key, value in data.items() if key not in ('category', 'tags')}
+            if fields.get('status') == Article.Status.PUBLISHED and not fields.get('published_at'):
+                fields['published_at'] = now
+            created.append(Article(
+                **fields,
+                slug=slug,
+                author=author,
+                category=categories.get(data.get('category')),
+            ))
+        Article.objects.bulk_create(created, batch_size=batch_size)
+        Article.tags.through.objects.bulk_create([
+            Article.tags.through(article_id=article.pk, tag_id=tag_id)
+            for article, data in zip(created, articles)
+            # Two names can resolve to the same tag
+            for tag_id in dict.fromkeys(tags[name].pk for name in data.get('tags', ()))
+        ], batch_size=batch_size)
+    schedule_related_update([article.pk for article in created if article.status == Article.Status.PUBLISHED])
+    bump_generation()
+    return created
@@ -0,0 +1,130 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.articles.models import Article
+from apps.articles.purge import purge_articles, purge_content, purge_users
+from apps.core.benchmark import QueryRecorder, benchmark_database
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the most commented articles, the most prolific users, then everything like '
+        '`seed --clear`, through QuerySet.delete() then through the set-based purge, and compare '
+        'time, queries and memory. Every deletion is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=2000, help='Articles to seed in the benchmark database')
+        parser.add_argument('--comments-per-article', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--delete-articles', type=int, default=200, help='Articles deleted by the first scenario')
+        parser.add_argument('--delete-users', type=int, default=20, help='Users deleted by the second scenario')
+        parser.add_argument(
+            '--existing-db', action='store_true',
+            help='Run against the configured database instead of a freshly seeded test database',
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='JSON results file (default: bench_results/purge-<timestamp>.json)',
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(
+            options['articles'], options['comments_per_article'], options['seed'], options['existing_db']
+        ):
+            results = {}
+            for name, run in self.scenarios(options).items():
+                results[name] = {
+                    path: self.measure(lambda: run(signals))
+                    for path, signals in (('collector', True), ('purge', False))
+                }
+                if results[name]['collector']['rows'] != results[name]['purge']['rows']:
+                    raise CommandError(
+                        f"{name}: the purge deleted {results[name]['purge']['rows']}, "
+                        f"QuerySet.delete() {results[name]['collector']['rows']}"
+                    )
+                self.report(name, results[name])
+        self.write_results(results, options)
+
+    def scenarios(self, options):
+        article_ids = list(
+            Article.objects.order_by('-comments_count', 'pk').values_list('pk', flat=True)[:options['delete_articles']]
+        )
+        user_ids = list(
+            User.objects.filter(is_superuser=False).annotate(written=Count('articles'))
+            .order_by('-written', 'pk').values_list('pk', flat=True)[:options['delete_users']]
+        )
+        if not article_ids or not user_ids:
+            raise CommandError('No article or user to delete, seed the database first.')
+        return {
+            'articles': lambda signals: purge_articles(Article.objects.filter(pk__in=article_ids), signals),
+            'users': lambda signals: purge_users(User.objects.filter(pk__in=user_ids), signals),
+            'clear': purge_content,
+        }
+
+    def measure(self, delete):
+        # Time and queries first, then memory: tracemalloc slows allocations down
+        with QueryRecorder() as recorder:
+            start = time.perf_counter()
+            rows = self.rolled_back(delete)
+            elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            self.rolled_back(delete)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'ms': round(elapsed * 1000, 1),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.duration * 1000, 1),
+            'peak_kib': round(peak / 1024, 1),
+            'rows': {label: count for label, count in sorted(rows.items()) if count},
+        }
+
+    def rolled_back(self, delete):
+        try:
+            with transaction.atomic():
+                rows = delete()
+                raise Rollback
+        except Rollback:
+            return rows
+
+    def report(self, name, result):
+        rows = sum(result['purge']['rows'].values())
+        self.stdout.write(f'{name} ({rows} rows)')
+        for path, row in result.items():
+            self.stdout.write(
+                f"  {path:<10} {row['ms']:>9.1f}ms  {row['queries']:>6} queries  "
+                f"{row['sql_ms']:>9.1f}ms SQL  {row['peak_kib']:>9.1f} KiB peak"
+            )
+
+    def write_results(self, results, options):
+        now = timezone.now()
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' / f"purge-{now:%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'created_at': now.isoformat(),
+            'options': {
+                key: options[key]
+                for key in (
+                    'articles', 'comments_per_article', 'seed', 'delete_articles', 'delete_users', 'existing_db',
+                )
+            },
+            'scenarios': results,
+        }
+        output.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from faker import Faker
+from rest_framework import filters
+from rest_framework.request import Request
+
+from apps.articles.models import Article
+from apps.articles.search import FullTextSearchFilter, search_index_available
+from apps.articles.views import ArticleViewSet
+
+CLIMBING_WORDS = [
+    'escalade', 'falaise', 'grimpeur', 'grimpeuse', 'voie', 'bloc', 'relais',
+    'dégaine', 'baudrier', 'sécurité', 'assurage', 'corde', 'prise', 'réglette',
+    'dévers', 'dalle', 'entraînement', 'échauffement', 'montagne', 'glacier',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare FTS5 search with the LIKE based SearchFilter on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100_000, help='Synthetic articles to insert')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per search term')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the corpus')
+        parser.add_argument(
+            '--term', action='append', dest='terms',
+            help='Search term to benchmark (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        if not search_index_available('default'):
+            raise CommandError('FTS5 search index not found, run migrate first.')
+        terms = options['terms'] or ['escalade', 'securite', 'grande voie', 'relais dégaine']
+
+        # Everything happens in a transaction rolled back at the end
+        with transaction.atomic():
+            self.create_corpus(options['articles'], options['seed'])
+            self.stdout.write(f"{'term':<20} {'like ms':>10} {'fts ms':>10} {'like rows':>10} {'fts rows':>10}")
+            for term in terms:
+                like_ms, like_rows = self.run_search(filters.SearchFilter(), term, options['repeat'])
+                fts_ms, fts_rows = self.run_search(FullTextSearchFilter(), term, options['repeat'])
+                self.stdout.write(f'{term:<20} {like_ms:>10.1f} {fts_ms:>10.1f} {like_rows:>10} {fts_rows:>10}')
+            transaction.set_rollback(True)
+
+    def create_corpus(self, count, seed):
+        rng = random.Random(seed)
+        fake = Faker('fr_FR')
+        fake.seed_instance(seed)
+        vocabulary = fake.words(nb=1500) + CLIMBING_WORDS
+        author = User.objects.order_by('pk').first()
+        if author is None:
+            author = User.objects.create_user(username='bench-search')
+
+        def text(words):
+            return ' '.join(rng.choices(vocabulary, k=words))
+
+        start = time.perf_counter()
+        now = timezone.now()
+        batch_size = 2000
+        for offset in range(0, count, batch_size):
+            Article.objects.bulk_create([
+                Article(
+                    title=text(6).capitalize(),
+                    slug=f'bench-search-{offset + i}',
+                    excerpt=text(30),
+                    content=text(300),
+                    author=author,
+                    status=Article.Status.PUBLISHED,
+                    published_at=now,
+                )
+                for i in range(min(batch_size, count - offset))
+            ])
+        self.stdout.write(f'Inserted {count} articles in {time.perf_counter() - start:.1f}s\n')
+
+    def run_search(self, backend, term, repeat):
+        request = Request(RequestFactory().get('/api/articles/', {'search': term}))
+        view = ArticleViewSet(request=request, format_kwarg=None)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset = backend.filter_queryset(request, Article.objects.filter(status='published'), view)
+            rows = queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), rows
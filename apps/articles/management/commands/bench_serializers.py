@@ -0,0 +1,90 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.articles.fast_serializers import ArticleListRowSerializer, CommentRowSerializer
+from apps.articles.models import Article, Comment
+from apps.articles.serializers import ArticleListSerializer, CommentSerializer, build_comment_tree
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the row serializers render exactly like ArticleListSerializer and '
+        'CommentSerializer, then compare their rows/sec'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Articles per run')
+        parser.add_argument('--articles-with-comments', type=int, default=200, help='Comment threads to compare')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path, the best one is kept')
+        parser.add_argument('--check-only', action='store_true', help='Only run the parity checks')
+
+    def handle(self, *args, **options):
+        self.renderer = JSONRenderer()
+        articles = (
+            Article.objects.select_related('author', 'author__profile', 'category')
+            .prefetch_related('tags')
+            .order_by('-published_at', '-pk')
+        )
+        if not articles.exists():
+            raise CommandError('No article found, run `manage.py seed` first.')
+
+        self.check_articles(articles, options['rows'])
+        self.check_comments(options['articles_with_comments'])
+        self.stdout.write(self.style.SUCCESS('Row serializers render exactly like the DRF serializers.'))
+        if options['check_only']:
+            return
+
+        rows = options['rows']
+        row_serializer = ArticleListRowSerializer()
+        self.report('ArticleListSerializer', rows, options['repeat'], lambda: ArticleListSerializer(
+            list(articles[:rows]), many=True,
+        ).data)
+        self.report('ArticleListRowSerializer', rows, options['repeat'], lambda: row_serializer.serialize(
+            list(row_serializer.get_rows_queryset(articles)[:rows]),
+        ))
+
+    def check_articles(self, articles, rows):
+        row_serializer = ArticleListRowSerializer()
+        expected = ArticleListSerializer(list(articles[:rows]), many=True).data
+        actual = row_serializer.serialize(list(row_serializer.get_rows_queryset(articles)[:rows]))
+        self.compare('article list', expected, actual)
+
+    def check_comments(self, count):
+        article_ids = (
+            Article.objects.filter(comments_count__gt=0).order_by('-comments_count', 'pk')
+            .values_list('pk', flat=True)[:count]
+        )
+        for article_id in article_ids:
+            comments = Comment.objects.filter(article_id=article_id).select_related('author', 'author__profile')
+            _, children = build_comment_tree(comments)
+            page = comments.order_by('-created_at')
+            expected = CommentSerializer(
+                list(page), many=True, context={'comment_children': children},
+            ).data
+            row_serializer = CommentRowSerializer(Comment.objects.filter(article_id=article_id))
+            actual = row_serializer.serialize(list(row_serializer.get_rows_queryset(page)))
+            self.compare(f'comments of article {article_id}', expected, actual)
+
+    def compare(self, label, expected, actual):
+        if self.renderer.render(expected) == self.renderer.render(actual):
+            return
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            if self.renderer.render(left) != self.renderer.render(right):
+                raise CommandError(
+                    f'{label}: row {index} differs\n'
+                    f'  expected {self.renderer.render(left).decode()}\n'
+                    f'  actual   {self.renderer.render(right).decode()}'
+                )
+        raise CommandError(f'{label}: {len(expected)} rows expected, got {len(actual)}')
+
+    def report(self, label, rows, repeat, run):
+        # Queries included: each path loads what it needs for the page
+        best = min(self.timed(run) for _ in range(repeat))
+        self.stdout.write(f'{label:<26} {rows / best:>10.0f} rows/s  ({best * 1000:.1f}ms for {rows} rows)')
+
+    def timed(self, run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.articles.models import Article, Comment
+
+# Tables that grow with content, a full scan of any of them is a regression
+WATCHED_TABLES = {
+    'articles_article', 'articles_comment', 'articles_article_tags',
+    'articles_articleviewcount', 'articles_relatedarticle',
+}
+
+
+def plan_endpoints(article, member, staff, thread=None):
+    """(user, url) of the checked GET endpoints, user None for anonymous."""
+    category = article.category.slug if article.category else 'bloc'
+    endpoints = [
+        (None, '/api/articles/'),
+        (None, '/api/articles/?pagination=cursor'),
+        (None, f'/api/articles/?category__slug={category}'),
+        (None, f'/api/articles/?author__username={article.author.username}'),
+        (None, '/api/articles/?search=escalade'),
+        (None, '/api/articles/facets/'),
+        (None, f'/api/articles/facets/?category__slug={category}'),
+        (None, '/api/articles/export/'),
+        (None, '/api/articles/trending/'),
+        (None, f'/api/articles/{article.slug}/'),
+        (None, f'/api/articles/{article.slug}/related/'),
+        (None, f'/api/articles/{article.slug}/comments/'),
+        (None, f'/api/articles/{article.slug}/comments/?pagination=cursor'),
+        (None, f'/api/articles/{article.slug}/comments/?depth=0'),
+        (None, f'/api/articles/{article.slug}/comments/threads/'),
+        (member, '/api/articles/'),
+        (staff, '/api/articles/'),
+        (staff, '/api/articles/?status=draft'),
+    ]
+    if thread is not None:
+        endpoints.append((None, f'/api/articles/{article.slug}/comments/?thread={thread.pk}'))
+    return endpoints
+
+
+def get_queries(client, user, url):
+    """Response and captured queries of GET `url` as `user`, streamed bodies included."""
+    cache.clear()
+    headers = {}
+    if user is not None:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(user)}'
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    return response, queries.captured_queries
+
+
+def query_plan(sql):
+    """EXPLAIN QUERY PLAN steps of `sql`, empty for anything but a SELECT."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def is_full_scan(step):
+    # "SCAN articles_article" without "USING ... INDEX" reads every row
+    words = step.split()
+    if len(words) < 2 or words[0] != 'SCAN' or 'USING' in words:
+        return False
+    return words[1] in WATCHED_TABLES
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on every query issued by the article endpoints and fail on full scans'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN checks only run on SQLite.')
+        self.verbosity = options['verbosity']
+
+        article = Article.objects.filter(status='published').order_by('pk').first()
+        if article is None:
+            raise CommandError('No published article found, run `manage.py seed` first.')
+        member = User.objects.filter(is_staff=False).order_by('pk').first()
+        staff = User.objects.filter(is_staff=True).order_by('pk').first()
+        thread = Comment.objects.filter(article=article, depth=0).order_by('pk').first()
+
+        failures = 0
+        client = Client()
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for user, url in plan_endpoints(article, member, staff, thread):
+                response, captured = get_queries(client, user, url)
+                label = f"{url} ({user.username if user else 'anonymous'})"
+                if response.status_code != 200:
+                    raise CommandError(f'{label} returned {response.status_code}')
+                failures += self.check_queries(label, captured)
+
+        if failures:
+            raise CommandError(f'{failures} queries fall back to a full table scan.')
+        self.stdout.write(self.style.SUCCESS('No full table scans on watched tables.'))
+
+    def check_queries(self, label, captured):
+        failures = 0
+        for query in captured:
+            plan = query_plan(query['sql'])
+            if any(is_full_scan(step) for step in plan):
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}'))
+                self.stdout.write(f"  {query['sql']}")
+                for step in plan:
+                    self.stdout.write(f'    {step}')
+            elif plan and self.verbosity > 1:
+                self.stdout.write(f'ok  {label}: {" | ".join(plan)}')
+        return failures
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.articles.models import Article, Tag
+
+# Queries allowed for POST /api/articles/ and PATCH /api/articles/<slug>/,
+# whatever the number of tags sent
+CREATE_BUDGET = 8
+UPDATE_BUDGET = 8
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Count the queries of article create and update with few and many tags, fail if '
+        'they grow with the number of tags or go over budget. Nothing is kept in the database.'
+    )
+
+    def handle(self, *args, **options):
+        tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True)[:40])
+        if len(tag_ids) < 4:
+            raise CommandError('At least 4 tags are needed, run `manage.py seed` first.')
+        half = len(tag_ids) // 2
+        author = User.objects.filter(is_active=True).order_by('pk').first()
+        self.client = Client()
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(author)}'}
+
+        counts = {}
+        with override_settings(ALLOWED_HOSTS=['*']):
+            # Warm-up: the first request also loads the user into the auth cache
+            self.measure(tag_ids[:1], tag_ids[half:half + 1])
+            # The update swaps every tag for another one
+            for size in (1, half):
+                counts[size] = self.measure(tag_ids[:size], tag_ids[half:half + size])
+            self.check_missing_ids(tag_ids)
+
+        for size, (create, update) in counts.items():
+            self.stdout.write(f'{size:>2} tags: create {create} queries, update {update} queries')
+        (create_few, update_few), (create_many, update_many) = counts.values()
+        if create_many != create_few or update_many != update_few:
+            raise CommandError('The number of queries grows with the number of tags.')
+        if create_many > CREATE_BUDGET or update_many > UPDATE_BUDGET:
+            raise CommandError(f'Over budget ({CREATE_BUDGET} per create, {UPDATE_BUDGET} per update).')
+        self.stdout.write(self.style.SUCCESS('Article writes stay within their query budget.'))
+
+    def measure(self, tags, new_tags):
+        """Queries of one create and one update changing every tag, rolled back."""
+        try:
+            with transaction.atomic():
+                self.request('post', '/api/articles/', {
+                    'title': 'Vérification des requêtes', 'excerpt': 'Résumé', 'content': 'Contenu', 'tags': tags,
+                }, 201)
+                create = self.queries
+                # The write serializer does not return the slug
+                slug = Article.objects.order_by('-pk').values_list('slug', flat=True).first()
+                self.request('patch', f'/api/articles/{slug}/', {'tags': new_tags}, 200)
+                update = self.queries
+                raise Rollback
+        except Rollback:
+            pass
+        return create, update
+
+    def check_missing_ids(self, tag_ids):
+        missing = [max(tag_ids) + 1000, max(tag_ids) + 1001]
+        self.request('post', '/api/articles/', {
+            'title': 'Tags inconnus', 'excerpt': 'Résumé', 'content': 'Contenu', 'tags': tag_ids[:2] + missing,
+        }, 400)
+        message = str(self.response.json()['tags'])
+        if not all(str(pk) in message for pk in missing):
+            raise CommandError(f'Every unknown tag id should be reported: {message}')
+        if self.queries > 2:
+            raise CommandError(f'Tag validation took {self.queries} queries.')
+
+    def request(self, method, url, data, expected_status):
+        with CaptureQueriesContext(connection) as queries:
+            self.response = getattr(self.client, method)(
+                url, data, content_type='application/json', **self.headers
+            )
+        if self.response.status_code != expected_status:
+            raise CommandError(f'{method.upper()} {url} returned {self.response.status_code}: {self.response.content}')
+        self.queries = len(queries)
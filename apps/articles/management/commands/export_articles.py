@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.articles.export import EXPORT_CHUNK_SIZE, export_queryset, iter_ndjson, parse_updated_since
+from apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Stream the articles as NDJSON, the same lines as /api/articles/export/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='File to write (default: stdout)')
+        parser.add_argument('--updated-since', default=None, help='Only articles changed after this ISO 8601 date')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows read per query')
+        parser.add_argument('--include-drafts', action='store_true', help='Also export draft articles')
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_updated_since(options['updated_since'])
+            except ValueError:
+                raise CommandError(f"Invalid --updated-since date: {options['updated_since']}")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        queryset = Article.objects.all()
+        if not options['include_drafts']:
+            queryset = queryset.filter(status='published')
+        queryset = export_queryset(queryset, updated_since)
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for lines in iter_ndjson(queryset, options['chunk_size']):
+                output.write(lines)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Articles exported to {options['output']}"))
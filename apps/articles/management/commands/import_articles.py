@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.articles.importer import IMPORT_BATCH_SIZE, import_articles, parse_ndjson, validate_import
+
+
+class Command(BaseCommand):
+    help = 'Import articles from a JSON array or NDJSON file, like POST /api/articles/import/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='.json file holding an array, or NDJSON (one article per line)')
+        parser.add_argument('--author', required=True, help='Username of the author of the imported articles')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file')
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['author']}")
+
+        items = self.read(options['path'])
+        start = time.perf_counter()
+        articles, errors = validate_import(items)
+        if errors:
+            for position, error in enumerate(errors):
+                if error:
+                    self.stderr.write(f'Article {position + 1}: {json.dumps(error, ensure_ascii=False)}')
+            raise CommandError('Invalid articles, nothing was imported.')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(articles)} valid articles.'))
+            return
+
+        created = import_articles(articles, author, options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} articles imported in {elapsed:.2f}s.'))
+
+    def read(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                head = file.read(1024).lstrip()
+                file.seek(0)
+                if head.startswith('['):
+                    return json.load(file)
+                return parse_ndjson(file)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'Invalid JSON in {path}: {exc}')
@@ -0,0 +1,31 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.articles.purge import purge_users
+
+
+class Command(BaseCommand):
+    help = 'Delete users with their profile, articles and comments (replies included) in a few statements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+        parser.add_argument(
+            '--with-signals', action='store_true',
+            help='Delete through QuerySet.delete() so delete signals fire (loads every deleted row)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username__in=options['usernames'])
+        unknown = set(options['usernames']) - set(users.values_list('username', flat=True))
+        if unknown:
+            raise CommandError(f"Unknown users: {', '.join(sorted(unknown))}")
+
+        start = time.perf_counter()
+        counts = purge_users(users, options['with_signals'])
+        elapsed = time.perf_counter() - start
+        for label, rows in sorted(counts.items()):
+            if rows:
+                self.stdout.write(f'  {label}: {rows}')
+        self.stdout.write(self.style.SUCCESS(f"{counts.get('auth.User', 0)} users deleted in {elapsed:.2f}s."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Recompute Article.comments_count and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted articles',
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(
+            Article.objects.annotate(actual=Count('comments'))
+            .exclude(comments_count=F('actual'))
+            .values_list('pk', 'slug', 'comments_count', 'actual')
+        )
+        for pk, slug, stored, actual in drifted:
+            self.stdout.write(f'  {slug} (#{pk}): {stored} -> {actual}')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All comment counters are up to date.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} articles have drifted.'))
+        else:
+            Article.objects.filter(pk__in=[row[0] for row in drifted]).refresh_comments_count()
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted)} articles.'))
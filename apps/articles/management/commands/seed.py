@@ -1,13 +1,44 @@
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
 from django.utils import timezone
 from faker import Faker
+from slugify import slugify
 
+from apps.articles.cache import bump_generation
 from apps.articles.models import Article, Category, Comment, Tag
+from apps.articles.purge import purge_content
+from apps.articles.related import rebuild_related
+from apps.users.models import Profile
 
-fake = Faker('fr_FR')
+
+def generate_texts(task):
+    """Generate article and comment texts for one batch (runs in a worker process)."""
+    seed, batch, articles, comments_per_article = task
+    faker = Faker('fr_FR')
+    faker.seed_instance(seed * 1_000_003 + batch)
+    rows = []
+    for _ in range(articles):
+        rows.append({
+            'title': faker.sentence(nb_words=6).rstrip('.'),
+            'excerpt': faker.paragraph(nb_sentences=2),
+            'content': '\n\n'.join(
+                faker.paragraph(nb_sentences=faker.random_int(4, 8))
+                for _ in range(faker.random_int(4, 7))
+            ),
+            'comments': [
+                faker.paragraph(nb_sentences=faker.random_int(1, 3))
+                for _ in range(comments_per_article)
+            ],
+        })
+    return rows
 
 
 class Command(BaseCommand):
@@ -19,24 +50,74 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before seeding',
         )
+        parser.add_argument(
+            '--with-signals',
+            action='store_true',
+            help='With --clear: delete through QuerySet.delete() so delete signals fire (slow on large data)',
+        )
+        parser.add_argument(
+            '--articles',
+            type=int,
+            help='Scale mode: number of generated articles (bulk inserts)',
+        )
+        parser.add_argument(
+            '--comments-per-article',
+            type=int,
+            default=5,
+            help='Scale mode: comments per published article',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            help='Scale mode: number of generated users (default: articles / 20)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Scale mode: articles per bulk insert batch',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Scale mode: processes generating Faker text',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for reproducible data',
+        )
 
     def handle(self, *args, **options):
+        # Every generated value comes from these two, so --seed reproduces the data
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('fr_FR')
+        self.fake.seed_instance(options['seed'])
+
         if options['clear']:
-            self.stdout.write('Clearing existing data...')
-            Comment.objects.all().delete()
-            Article.objects.all().delete()
-            Tag.objects.all().delete()
-            Category.objects.all().delete()
-            User.objects.filter(is_superuser=False).delete()
+            self.clear(options['with_signals'])
 
         self.create_categories()
         self.create_tags()
-        self.create_users()
-        self.create_articles()
-        self.create_comments()
+        users_created = self.create_users()
+        if options['articles'] is not None:
+            self.seed_scale(options, users_created)
+        else:
+            self.stdout.write(f'  Created {users_created} regular users')
+            self.create_articles()
+            self.create_comments()
 
         self.stdout.write(self.style.SUCCESS('Database seeded successfully!'))
 
+    def clear(self, signals):
+        self.stdout.write('Clearing existing data...')
+        started = time.perf_counter()
+        for label, rows in sorted(purge_content(signals).items()):
+            self.stdout.write(f'  Deleted {rows} {label}')
+        self.stdout.write(f'  Cleared in {time.perf_counter() - started:.1f}s')
+
     def create_categories(self):
         categories = [
             {'name': 'Bloc', 'description': 'Escalade sur blocs de faible hauteur sans corde'},
@@ -61,6 +142,7 @@ class Command(BaseCommand):
         self.stdout.write(f'  Created {len(tags)} tags')
 
     def create_users(self):
+        """Create the admin and user1..user5 when missing, returns the regular users created."""
         # Create admin if doesn't exist
         if not User.objects.filter(username='admin').exists():
             admin = User.objects.create_superuser(
@@ -83,19 +165,19 @@ class Command(BaseCommand):
                     username=username,
                     email=f'{username}@summit.local',
                     password='password123',
-                    first_name=fake.first_name(),
-                    last_name=fake.last_name()
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name()
                 )
-                user.profile.bio = fake.paragraph(nb_sentences=2)
-                user.profile.website = fake.url() if random.random() > 0.5 else ''
+                user.profile.bio = self.fake.paragraph(nb_sentences=2)
+                user.profile.website = self.fake.url() if self.rng.random() > 0.5 else ''
                 user.profile.save()
                 users_created += 1
-        self.stdout.write(f'  Created {users_created} regular users')
+        return users_created
 
     def create_articles(self):
         categories = list(Category.objects.all())
         tags = list(Tag.objects.all())
-        authors = list(User.objects.all())
+        authors = list(User.objects.order_by('pk'))
 
         climbing_titles = [
             "Comment débuter l'escalade en salle",
@@ -118,50 +200,190 @@ class Command(BaseCommand):
         articles_created = 0
         for title in climbing_titles:
             if not Article.objects.filter(title=title).exists():
+                status = self.rng.choices(['draft', 'published'], weights=[0.2, 0.8])[0]
                 article = Article.objects.create(
                     title=title,
-                    excerpt=fake.paragraph(nb_sentences=2),
+                    excerpt=self.fake.paragraph(nb_sentences=2),
                     content=self._generate_article_content(),
-                    image_url=f'https://picsum.photos/seed/{fake.uuid4()}/1200/600',
-                    author=random.choice(authors),
-                    category=random.choice(categories),
-                    status=random.choices(['draft', 'published'], weights=[0.2, 0.8])[0],
-                    published_at=timezone.now() - timezone.timedelta(days=random.randint(0, 60))
+                    image_url=f'https://picsum.photos/seed/{self.fake.uuid4()}/1200/600',
+                    author=self.rng.choice(authors),
+                    category=self.rng.choice(categories),
+                    status=status,
+                    # Drafts have not been published yet
+                    published_at=(
+                        timezone.now() - timezone.timedelta(days=self.rng.randint(0, 60))
+                        if status == 'published' else None
+                    ),
                 )
-                article.tags.set(random.sample(tags, k=random.randint(2, 5)))
+                article.tags.set(self.rng.sample(tags, k=self.rng.randint(2, 5)))
                 articles_created += 1
         self.stdout.write(f'  Created {articles_created} articles')
 
     def _generate_article_content(self):
-        paragraphs = [fake.paragraph(nb_sentences=random.randint(4, 8)) for _ in range(random.randint(4, 7))]
+        paragraphs = [
+            self.fake.paragraph(nb_sentences=self.rng.randint(4, 8)) for _ in range(self.rng.randint(4, 7))
+        ]
         return '\n\n'.join(paragraphs)
 
     def create_comments(self):
-        articles = Article.objects.filter(status='published')
-        users = list(User.objects.all())
+        articles = Article.objects.filter(status='published').order_by('pk')
+        users = list(User.objects.order_by('pk'))
 
         comments_created = 0
         for article in articles:
             # Create 2-6 root comments per article
-            num_comments = random.randint(2, 6)
+            num_comments = self.rng.randint(2, 6)
             for _ in range(num_comments):
                 root_comment = Comment.objects.create(
                     article=article,
-                    author=random.choice(users),
-                    content=fake.paragraph(nb_sentences=random.randint(1, 3)),
+                    author=self.rng.choice(users),
+                    content=self.fake.paragraph(nb_sentences=self.rng.randint(1, 3)),
                 )
                 comments_created += 1
 
                 # 50% chance of having 1-2 replies
-                if random.random() > 0.5:
-                    num_replies = random.randint(1, 2)
+                if self.rng.random() > 0.5:
+                    num_replies = self.rng.randint(1, 2)
                     for _ in range(num_replies):
                         Comment.objects.create(
                             article=article,
-                            author=random.choice(users),
-                            content=fake.paragraph(nb_sentences=random.randint(1, 2)),
+                            author=self.rng.choice(users),
+                            content=self.fake.paragraph(nb_sentences=self.rng.randint(1, 2)),
                             parent=root_comment,
                         )
                         comments_created += 1
 
         self.stdout.write(f'  Created {comments_created} comments')
+
+    # Scale mode -----------------------------------------------------------
+
+    def seed_scale(self, options, users_created):
+        if options['articles'] < 0 or options['comments_per_article'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--articles, --comments-per-article and --batch-size must be positive.')
+        user_count = options['users'] if options['users'] is not None else max(5, options['articles'] // 20)
+
+        self.bulk_create_users(user_count, options['batch_size'])
+        self.stdout.write(f'  Created {users_created + user_count} regular users')
+        self.bulk_create_articles(options, self.rng)
+        # Bulk inserts bypass the model signals
+        stats = rebuild_related()
+        self.stdout.write(
+            f"  Related articles: {stats['rows']} rows in "
+            f"{stats['load_ms'] + stats['score_ms'] + stats['write_ms']:.0f}ms"
+        )
+        bump_generation()
+
+    def report(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(f'  {label}: {done}/{total} ({rate:,.0f} rows/s)')
+
+    def bulk_create_users(self, count, batch_size):
+        started = time.perf_counter()
+        # Hashing is deliberately slow, every generated user shares one hash
+        password = make_password('password123')
+        first = User.objects.filter(username__startswith='load').count() + 1
+        for offset in range(0, count, batch_size):
+            size = min(batch_size, count - offset)
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        username=f'load{first + offset + i}',
+                        email=f'load{first + offset + i}@summit.local',
+                        password=password,
+                        first_name=self.fake.first_name(),
+                        last_name=self.fake.last_name(),
+                    )
+                    for i in range(size)
+                ])
+                # Signals do not fire on bulk_create, profiles are created here
+                Profile.objects.create_for_users(users)
+            self.report('users', offset + size, count, started)
+
+    def bulk_create_articles(self, options, rng):
+        total = options['articles']
+        batch_size = options['batch_size']
+        per_article = options['comments_per_article']
+        author_ids = list(User.objects.values_list('pk', flat=True))
+        category_ids = list(Category.objects.values_list('pk', flat=True))
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        next_id = (Article.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        now = timezone.now()
+
+        tasks = [
+            (options['seed'], batch, min(batch_size, total - offset), per_article)
+            for batch, offset in enumerate(range(0, total, batch_size))
+        ]
+        started = time.perf_counter()
+        done = comments_done = 0
+        workers = max(1, options['workers'])
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            batches = executor.map(generate_texts, tasks) if executor else map(generate_texts, tasks)
+            for rows in batches:
+                articles = []
+                for row in rows:
+                    published = rng.random() < 0.8
+                    articles.append(Article(
+                        title=row['title'],
+                        # Suffixed with a running number so generated slugs never collide
+                        slug=f"{slugify(row['title'])[:180]}-{next_id + done + len(articles)}",
+                        excerpt=row['excerpt'],
+                        content=row['content'],
+                        image_url=f'https://picsum.photos/seed/{next_id + done + len(articles)}/1200/600',
+                        author_id=rng.choice(author_ids),
+                        category_id=rng.choice(category_ids),
+                        status=Article.Status.PUBLISHED if published else Article.Status.DRAFT,
+                        published_at=(
+                            now - timezone.timedelta(minutes=rng.randint(0, 525_600)) if published else None
+                        ),
+                        comments_count=per_article if published else 0,
+                    ))
+                with transaction.atomic():
+                    Article.objects.bulk_create(articles)
+                    Article.tags.through.objects.bulk_create([
+                        Article.tags.through(article_id=article.pk, tag_id=tag_id)
+                        for article in articles
+                        for tag_id in rng.sample(tag_ids, k=rng.randint(2, min(5, len(tag_ids))))
+                    ])
+                    comments_done += self.bulk_create_comments(articles, rows, author_ids, rng)
+                done += len(articles)
+                self.report('articles', done, total, started)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'  Created {done} articles and {comments_done} comments '
+            f'in {elapsed:.1f}s ({(done + comments_done) / elapsed if elapsed else 0:,.0f} rows/s)'
+        )
+
+    def bulk_create_comments(self, articles, rows, author_ids, rng):
+        roots = []
+        replies = []
+        for article, row in zip(articles, rows):
+            if article.status != Article.Status.PUBLISHED or not row['comments']:
+                continue
+            # About two thirds root comments, the rest replies to them
+            root_count = max(1, round(len(row['comments']) * 2 / 3))
+            article_roots = [
+                Comment(article_id=article.pk, author_id=rng.choice(author_ids), content=text)
+                for text in row['comments'][:root_count]
+            ]
+            roots.extend(article_roots)
+            replies.extend(
+                (rng.choice(article_roots), text)
+                for text in row['comments'][root_count:]
+            )
+        Comment.objects.bulk_create(roots)
+        Comment.objects.bulk_create([
+            Comment(
+                article_id=parent.article_id,
+                author_id=rng.choice(author_ids),
+                content=text,
+                parent_id=parent.pk,
+            )
+            for parent, text in replies
+        ])
+        return len(roots) + len(replies)
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_related_article'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleViewCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='view_counts', to='articles.article')),
+            ],
+            options={
+                'verbose_name': 'Vues par heure',
+                'verbose_name_plural': 'Vues par heure',
+                'indexes': [models.Index(fields=['hour'], name='article_view_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'hour'), name='article_view_hour_uniq')],
+            },
+        ),
+    ]
@@ -1,5 +1,12 @@
+import re
+from functools import reduce
+from operator import or_
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.signals import m2m_changed
+from django.db.models.functions import Coalesce, Concat, Substr
 from slugify import slugify
 
 
@@ -44,6 +51,59 @@ class Tag(models.Model):
         return self.name
 
 
+# Room left in Article.slug for a `-<number>` suffix
+SLUG_BASE_LENGTH = 180
+# Slug prefixes looked up per query, SQLite caps the depth of the OR chain
+SLUG_LOOKUP_BATCH = 500
+_SUFFIXED_SLUG = re.compile(r'(.+)-(\d+)')
+
+
+class ArticleQuerySet(models.QuerySet):
+
+    def allocate_slugs(self, titles):
+        """
+        Unique slugs for `titles`, in order. Taken slugs get the next free
+        `-<number>` suffix, duplicates inside `titles` included. Existing slugs
+        are read with one indexed range query per SLUG_LOOKUP_BATCH titles.
+        """
+        bases = [slugify(title, max_length=SLUG_BASE_LENGTH) or 'article' for title in titles]
+        # base -> suffixes in use, 1 standing for the bare base
+        used = {base: set() for base in bases}
+        distinct = list(used)
+        for start in range(0, len(distinct), SLUG_LOOKUP_BATCH):
+            batch = distinct[start:start + SLUG_LOOKUP_BATCH]
+            # `base` and every `base-...`: slugs only use [a-z0-9-], all below '~'
+            condition = reduce(or_, (Q(slug__range=(base, f'{base}-~')) for base in batch))
+            for slug in Article.objects.filter(condition).order_by().values_list('slug', flat=True):
+                if slug in used:
+                    used[slug].add(1)
+                match = _SUFFIXED_SLUG.fullmatch(slug)
+                if match and match[1] in used:
+                    used[match[1]].add(int(match[2]))
+
+        slugs = []
+        allocated = set()
+        for base in bases:
+            number = 1 if 1 not in used[base] else max(used[base]) + 1
+            slug = base if number == 1 else f'{base}-{number}'
+            # A suffixed slug can match the bare slug of another title
+            while slug in allocated:
+                number += 1
+                slug = f'{base}-{number}'
+            used[base].add(number)
+            allocated.add(slug)
+            slugs.append(slug)
+        return slugs
+
+
+    def refresh_comments_count(self):
+        """Recompute the stored comments_count from the comments table."""
+        counts = Comment.objects.filter(
+            article=OuterRef('pk')
+        ).order_by().values('article').annotate(total=Count('pk')).values('total')
+        return self.update(comments_count=Coalesce(Subquery(counts), 0))
+
+
 class Article(models.Model):
     """Blog article."""
 
@@ -82,20 +142,232 @@ class Article(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
+    # Maintained by the Comment signals, repaired by `manage.py recount_comments`
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Article'
         verbose_name_plural = 'Articles'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-published_at', '-id'], name='article_published_at_idx'),
+            models.Index(fields=['status', '-published_at', '-id'], name='article_status_pub_idx'),
+            models.Index(
+                fields=['category', '-published_at'],
+                condition=models.Q(status='published'),
+                name='article_category_pub_idx',
+            ),
+            models.Index(fields=['author', '-published_at'], name='article_author_pub_idx'),
+            # Export order and `?updated_since=` incremental pulls
+            models.Index(fields=['updated_at', 'id'], name='article_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The slug and status as stored, so the signals can drop the cached
+        # reference of a slug that is being renamed and notice (un)publishing
+        instance._loaded_slug = instance.__dict__.get('slug')
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = Article.objects.allocate_slugs([self.title])[0]
         super().save(*args, **kwargs)
+        self._loaded_slug = self.slug
+        self._loaded_status = self.status
 
     def __str__(self):
         return self.title
 
+    def set_tags(self, tags, current_ids=None):
+        """
+        Replace the tags, writing only the through rows that change.
+
+        Current ids come from `current_ids`, the prefetched tags or one query.
+        Unlike tags.set(), added ids are not read again before the insert.
+        Sends the m2m_changed signals of tags.add() and tags.remove().
+        """
+        through = Article.tags.through
+        if current_ids is None:
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('tags')
+            if prefetched is not None:
+                current_ids = {tag.pk for tag in prefetched}
+            else:
+                current_ids = set(through.objects.filter(article_id=self.pk).values_list('tag_id', flat=True))
+        new_ids = {tag.pk for tag in tags}
+        removed = set(current_ids) - new_ids
+        added = new_ids - set(current_ids)
+        if not removed and not added:
+            return
+
+        db = router.db_for_write(through, instance=self)
+        signal = {'sender': through, 'instance': self, 'reverse': False, 'model': Tag, 'using': db}
+        with transaction.atomic(using=db, savepoint=False):
+            if removed:
+                m2m_changed.send(action='pre_remove', pk_set=removed, **signal)
+                through.objects.using(db).filter(article_id=self.pk, tag_id__in=removed).delete()
+                m2m_changed.send(action='post_remove', pk_set=removed, **signal)
+            if added:
+                m2m_changed.send(action='pre_add', pk_set=added, **signal)
+                through.objects.using(db).bulk_create([
+                    through(article_id=self.pk, tag_id=tag_id) for tag_id in added
+                ])
+                m2m_changed.send(action='post_add', pk_set=added, **signal)
+        # Like tags.set(), the next read of article.tags goes to the database
+        getattr(self, '_prefetched_objects_cache', {}).pop('tags', None)
+
+
+class RelatedArticle(models.Model):
+    """One of the precomputed closest articles by shared tags, see related.py."""
+
+    # Indexed by the (article, position) constraint
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='neighbours',
+        db_index=False
+    )
+    related = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='neighbour_of'
+    )
+    score = models.FloatField()
+    # 0 for the closest, ties broken by publication date
+    position = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = 'Article lié'
+        verbose_name_plural = 'Articles liés'
+        ordering = ['article', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'position'], name='related_article_position_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class ArticleViewCount(models.Model):
+    """Views of an article during one hour, written by apps.articles.popularity."""
+
+    # Indexed by the (article, hour) constraint
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='view_counts',
+        db_index=False
+    )
+    # Start of the hour
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Vues par heure'
+        verbose_name_plural = 'Vues par heure'
+        constraints = [
+            # Also the conflict target of the flush upsert
+            models.UniqueConstraint(fields=['article', 'hour'], name='article_view_hour_uniq'),
+        ]
+        indexes = [
+            # Trending window and pruning
+            models.Index(fields=['hour'], name='article_view_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} @ {self.hour:%Y-%m-%d %H}h: {self.views}'
+
+
+# Comment.path is the hex ids of the ancestors then of the comment, each on
+# COMMENT_PATH_STEP characters: sorting by path lists every comment followed
+# by its replies, and the replies at any depth of a comment are the paths in
+# [its path, its path + PATH_END]
+COMMENT_PATH_STEP = 8
+COMMENT_PATH_LENGTH = 255
+COMMENT_MAX_DEPTH = COMMENT_PATH_LENGTH // COMMENT_PATH_STEP - 1
+# Sorts after every hex digit
+PATH_END = '~'
+COMMENT_PATH_BATCH_SIZE = 500
+
+
+def comment_path(parent_path, pk):
+    return f'{parent_path}{pk:0{COMMENT_PATH_STEP}x}'
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def threaded(self):
+        """Thread order: every comment followed by its replies, oldest first."""
+        return self.order_by('path')
+
+    def subtree(self, comment, max_depth=None):
+        """
+        `comment` and its replies at any depth, or down to `max_depth` levels
+        below it, as one range on the (article, path) index.
+        """
+        queryset = self.filter(
+            article_id=comment.article_id, path__range=(comment.path, comment.path + PATH_END)
+        )
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=comment.depth + max_depth)
+        return queryset
+
+    def reply_counts(self):
+        """
+        Root comment id -> replies at any depth, in thread order, for a
+        queryset holding whole threads. One grouped scan, threads being
+        ranges of paths.
+        """
+        rows = (
+            self.order_by()
+            .values(root=Substr('path', 1, COMMENT_PATH_STEP))
+            .annotate(comments=Count('pk'))
+            .order_by('root')
+            .values_list('root', 'comments')
+        )
+        return {int(root, 16): comments - 1 for root, comments in rows}
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        bulk_create() filling path and depth, which need the ids: the rows
+        are written again with one upsert per COMMENT_PATH_BATCH_SIZE.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        created = {comment.pk: comment for comment in objs if comment.pk is not None and not comment.path}
+        if not created:
+            return objs
+        paths = {
+            pk: (path, depth)
+            for pk, path, depth in self.model._base_manager.using(self.db).filter(
+                pk__in={comment.parent_id for comment in created.values()} - created.keys() - {None}
+            ).values_list('pk', 'path', 'depth')
+        }
+
+        def locate(comment):
+            if comment.pk not in paths:
+                if comment.parent_id is None:
+                    parent_path, depth = '', -1
+                elif comment.parent_id in created:
+                    parent_path, depth = locate(created[comment.parent_id])
+                else:
+                    parent_path, depth = paths[comment.parent_id]
+                comment.path = comment_path(parent_path, comment.pk)
+                comment.depth = depth + 1
+                paths[comment.pk] = comment.path, comment.depth
+            return paths[comment.pk]
+
+        for comment in created.values():
+            locate(comment)
+        super().bulk_create(
+            created.values(), batch_size=COMMENT_PATH_BATCH_SIZE,
+            update_conflicts=True, unique_fields=['id'], update_fields=['path', 'depth'],
+        )
+        return objs
+
 
 class Comment(models.Model):
     """Article comment with nested replies support."""
@@ -118,13 +390,58 @@ class Comment(models.Model):
         related_name='replies'
     )
     content = models.TextField()
+    # Materialized path, see COMMENT_PATH_STEP, and distance to the root comment
+    path = models.CharField(max_length=COMMENT_PATH_LENGTH, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Commentaire'
         verbose_name_plural = 'Commentaires'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['article', 'parent', 'created_at'], name='comment_thread_idx'),
+            models.Index(fields=['article', '-created_at'], name='comment_article_created_idx'),
+            # Thread order, subtrees and reply counts
+            models.Index(fields=['article', 'path'], name='comment_path_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The parent as stored, so save() notices a move to another parent
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        moved = self.parent_id != getattr(self, '_loaded_parent_id', self.parent_id)
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if not self.path or moved:
+                self.place(using)
+        self._loaded_parent_id = self.parent_id
+
+    def place(self, using):
+        """Set the path and depth under the current parent, moving the replies along."""
+        parent = self.parent
+        path = comment_path(parent.path if parent else '', self.pk)
+        depth = parent.depth + 1 if parent else 0
+        comments = Comment.objects.using(using)
+        if self.path and path.startswith(self.path):
+            raise ValueError('A comment cannot become a reply to one of its own replies.')
+        if self.path:
+            # One range update rewrites the prefix of the whole subtree
+            comments.subtree(self).update(
+                path=Concat(Value(path), Substr('path', len(self.path) + 1), output_field=models.CharField()),
+                depth=F('depth') + (depth - self.depth),
+            )
+        else:
+            comments.filter(pk=self.pk).update(path=path, depth=depth)
+        self.path, self.depth = path, depth
 
     def __str__(self):
         return f"Commentaire de {self.author.username} sur {self.article.title}"
@@ -0,0 +1,253 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on (ordering field, id).
+
+    The cursor holds the sort key of the last row seen, so every page is a
+    single range query: no COUNT(*) and no OFFSET, page 5000 costs the same
+    as page 1. The ordering field is taken from the filtered queryset, which
+    keeps `?ordering=` working. A queryset sorted on a computed value (the
+    search rank) is refused rather than paged in another order.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Curseur invalide.'
+    computed_ordering_message = (
+        'Pagination par curseur impossible avec ce tri (pertinence de la recherche) : '
+        'utilisez ?ordering= ou la pagination par page.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        return self.get_page([row async for row in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def get_page_queryset(self, queryset, request, view):
+        """The page as a queryset, with one extra row to detect a next page."""
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.field, self.descending = self.get_ordering_key(queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor['r'] if self.cursor else False
+
+        queryset = queryset.order_by(*self.get_order_by(self.reverse))
+        if self.cursor:
+            queryset = queryset.filter(self.get_position_filter(self.cursor, self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Going forward there is always a way back, and vice versa
+        has_next = has_more if not self.reverse else self.cursor is not None
+        has_previous = has_more if self.reverse else self.cursor is not None
+        self.next_position = self.get_position(rows[-1]) if has_next and rows else None
+        self.previous_position = self.get_position(rows[0]) if has_previous and rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_position, reverse=False),
+            'previous': self.get_link(self.previous_position, reverse=True),
+            'results': data,
+        })
+
+    def get_ordering_key(self, queryset, view):
+        """Return (field, descending) for the first usable ordering term."""
+        model = queryset.model
+        query = queryset.query
+        if query.order_by and isinstance(query.order_by[0], str):
+            name = query.order_by[0].lstrip('-')
+            # Extra selects and annotations have no column to filter the next page on
+            if name in query.extra_select or name in query.annotation_select:
+                raise ValidationError({'pagination': self.computed_ordering_message})
+        sources = [
+            query.order_by,
+            getattr(view, 'ordering', None) or [],
+            model._meta.ordering,
+        ]
+        for ordering in sources:
+            for term in ordering:
+                if not isinstance(term, str):
+                    continue
+                name = term.lstrip('-')
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    continue
+                if field.concrete and not field.is_relation:
+                    return field, term.startswith('-')
+        return model._meta.pk, True
+
+    def get_order_by(self, reverse):
+        descending = self.descending != reverse
+        if self.field.primary_key:
+            return ['-pk' if descending else 'pk']
+        if descending:
+            return [F(self.field.name).desc(nulls_last=True), '-pk']
+        return [F(self.field.name).asc(nulls_first=True), 'pk']
+
+    def get_position_filter(self, cursor, reverse):
+        """Rows strictly after the cursor, NULLs sorting as the smallest value."""
+        pk = cursor['id']
+        descending = self.descending != reverse
+        if self.field.primary_key:
+            return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+
+        name = self.field.name
+        value = cursor['v']
+        if descending:
+            if value is None:
+                return Q(**{f'{name}__isnull': True, 'pk__lt': pk})
+            return (
+                Q(**{f'{name}__lt': value})
+                | Q(**{name: value, 'pk__lt': pk})
+                | Q(**{f'{name}__isnull': True})
+            )
+        if value is None:
+            return Q(**{f'{name}__isnull': True, 'pk__gt': pk}) | Q(**{f'{name}__isnull': False})
+        return Q(**{f'{name}__gt': value}) | Q(**{name: value, 'pk__gt': pk})
+
+    def get_position(self, row):
+        value = getattr(row, self.field.attname)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return {'f': self.field.name, 'v': value, 'id': row.pk}
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor({**position, 'r': reverse})
+        )
+
+    def encode_cursor(self, cursor):
+        payload = json.dumps(cursor, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            cursor = json.loads(payload)
+            if cursor['f'] != self.field.name or not isinstance(cursor['r'], bool):
+                raise ValueError
+            cursor['id'] = int(cursor['id'])
+            # A tampered value would fail later, inside the position filter
+            if cursor['v'] is not None and not self.field.primary_key:
+                cursor['v'] = self.field.to_python(cursor['v'])
+        except (DjangoValidationError, TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """PageNumberPagination that async views can also use, see apaginate_queryset()."""
+
+    def get_count_queryset(self, queryset, view=None):
+        """
+        The queryset counted for the page count: the view's `count_queryset`
+        if it sets one. COUNT(*) over a values_list() keeps the joins of its
+        columns, which stops SQLite from counting through an index.
+        """
+        count_queryset = getattr(view, 'count_queryset', None)
+        return queryset if count_queryset is None else count_queryset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property
+        paginator.count = self.get_count_queryset(queryset, view).count()
+        self.set_page(request, paginator)
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views: same pages and errors, with the
+        count and the rows read through the async ORM.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Filling Paginator.count avoids a sync COUNT
+        paginator.count = await self.get_count_queryset(queryset, view).acount()
+        self.set_page(request, paginator)
+        self.page.object_list = [
+            row async for row in self.page.object_list.aiterator(chunk_size=page_size)
+        ]
+        return list(self.page)
+
+    def set_page(self, request, paginator):
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+
+class OptionalCursorPagination(AsyncPageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset mode.
+
+    `?pagination=cursor` (or any `?cursor=`) switches to KeysetPagination,
+    otherwise the classic `?page=` behaviour is unchanged.
+    """
+
+    cursor_paginator_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            self.display_page_controls = False
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            self.display_page_controls = False
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_cursor(self, request):
+        params = request.query_params
+        return (
+            self.cursor_paginator_class.cursor_query_param in params
+            or params.get('pagination') == 'cursor'
+        )
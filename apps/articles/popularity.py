@@ -0,0 +1,201 @@
+"""
+Article view counters and trending articles.
+
+Views are counted in a per-process buffer keyed by article and hour. A
+background thread writes it every FLUSH_SECONDS with one INSERT ... ON
+CONFLICT DO UPDATE adding the buffered counts to the hourly rows, so SQLite
+takes its write lock once per interval rather than once per view. A buffer
+reaching MAX_PENDING keys wakes the thread early. It never holds more: while
+writes keep failing, views of new keys and the smallest counts past the cap
+are dropped with a warning. The buffer is also written at interpreter exit,
+so a graceful shutdown loses no view (a killed process loses at most one
+interval). Counting never writes itself: it runs in requests, async views
+included, on the event loop. With BACKGROUND off (tests, benchmarks) there
+is no thread and every view is written by the request that counts it.
+
+Trending articles are ranked by their views of the last days, each hourly
+bucket weighing half as much every HALF_LIFE_HOURS.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from .models import Article, ArticleViewCount
+
+logger = logging.getLogger(__name__)
+
+# Rows per upsert statement, 3 parameters each
+FLUSH_BATCH_SIZE = 300
+
+
+def get_config():
+    config = getattr(settings, 'ARTICLE_VIEWS', {})
+    return {
+        'BACKGROUND': config.get('BACKGROUND', True),
+        'FLUSH_SECONDS': config.get('FLUSH_SECONDS', 10),
+        'MAX_PENDING': config.get('MAX_PENDING', 10_000),
+        'RETENTION_DAYS': config.get('RETENTION_DAYS', 30),
+        'TRENDING_DAYS': config.get('TRENDING_DAYS', 7),
+        'HALF_LIFE_HOURS': config.get('HALF_LIFE_HOURS', 24),
+        'TRENDING_SIZE': config.get('TRENDING_SIZE', 10),
+    }
+
+
+def current_hour():
+    return timezone.now().replace(minute=0, second=0, microsecond=0)
+
+
+def write_views(counts):
+    """Add `counts` ((article id, hour) -> views) to the hourly rows, in one transaction."""
+    connection = connections[router.db_for_write(ArticleViewCount)]
+    quote = connection.ops.quote_name
+    table = quote(ArticleViewCount._meta.db_table)
+    article, hour, views = (
+        quote(ArticleViewCount._meta.get_field(name).column) for name in ('article', 'hour', 'views')
+    )
+    with transaction.atomic(using=connection.alias):
+        # Articles deleted since their views were counted would fail the foreign key
+        existing = set(
+            Article.objects.using(connection.alias)
+            .filter(pk__in={article_id for article_id, _ in counts}).order_by().values_list('pk', flat=True)
+        )
+        rows = [
+            (article_id, connection.ops.adapt_datetimefield_value(bucket), count)
+            for (article_id, bucket), count in counts.items()
+            if article_id in existing
+        ]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                batch = rows[start:start + FLUSH_BATCH_SIZE]
+                cursor.execute(
+                    f'INSERT INTO {table} ({article}, {hour}, {views}) '
+                    f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                    f'ON CONFLICT ({article}, {hour}) DO UPDATE SET {views} = {table}.{views} + excluded.{views}',
+                    [value for row in batch for value in row],
+                )
+        retention = timedelta(days=get_config()['RETENTION_DAYS'])
+        ArticleViewCount.objects.using(connection.alias).filter(hour__lt=current_hour() - retention).delete()
+
+
+class ViewBuffer:
+    """Views counted by this process and not written yet."""
+
+    def __init__(self):
+        self.reset()
+        # A forked worker starts empty and runs its own flush thread
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        # Views lost to a full buffer since the last warning
+        self.dropped = 0
+        self.thread = None
+        # Set when the buffer is full, the thread flushes without waiting
+        self.wake = threading.Event()
+
+    def add(self, article_id):
+        config = get_config()
+        key = article_id, current_hour()
+        with self.lock:
+            if key in self.pending or len(self.pending) < config['MAX_PENDING']:
+                self.pending[key] += 1
+            else:
+                # Only full while writes keep failing: lose the view, not the memory
+                self.dropped += 1
+            full = len(self.pending) >= config['MAX_PENDING']
+            if config['BACKGROUND'] and self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='article-views', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+        if not config['BACKGROUND']:
+            self.flush()
+        elif full:
+            self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait(get_config()['FLUSH_SECONDS'])
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the thread alive, the views stay pending
+                logger.exception('Article view flush failed')
+            finally:
+                # Connections are per thread, this one sleeps most of the time
+                connections.close_all()
+
+    def flush(self):
+        """Write the pending views, returns how many. On failure they stay pending, up to MAX_PENDING keys."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        written = False
+        try:
+            if pending:
+                write_views(pending)
+            written = True
+        except DatabaseError:
+            logger.exception('Could not write %d article view counters, retrying later', len(pending))
+        finally:
+            # Whatever interrupted the write, the views are counted again
+            with self.lock:
+                if not written:
+                    self.pending.update(pending)
+                    self.cap(get_config()['MAX_PENDING'])
+                dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning('Article view buffer full, %d views dropped', dropped)
+        return pending.total() if written else 0
+
+    def cap(self, max_pending):
+        """Keep the `max_pending` largest counters, the others are dropped. Called with the lock held."""
+        if len(self.pending) <= max_pending:
+            return
+        kept = Counter(dict(self.pending.most_common(max_pending)))
+        self.dropped += self.pending.total() - kept.total()
+        self.pending = kept
+
+
+view_buffer = ViewBuffer()
+
+
+def record_view(article_id):
+    view_buffer.add(article_id)
+
+
+def trending_articles(days=None, size=None):
+    """
+    (article id, views, score) of the published articles with the best
+    decayed views over the last `days` days, best first. Each hourly bucket
+    weighs 0.5 ** (its age in hours / HALF_LIFE_HOURS).
+    """
+    config = get_config()
+    days = days or config['TRENDING_DAYS']
+    size = size or config['TRENDING_SIZE']
+    now = current_hour()
+    half_life = timedelta(hours=config['HALF_LIFE_HOURS'])
+    hours = [now - timedelta(hours=age) for age in range(days * 24)]
+    weight = Case(
+        *(When(hour=hour, then=Value(0.5 ** ((now - hour) / half_life))) for hour in hours),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        ArticleViewCount.objects
+        .filter(hour__gte=hours[-1], article__status=Article.Status.PUBLISHED)
+        .values('article_id')
+        .annotate(total=Sum('views'), score=Sum(F('views') * weight))
+        .order_by('-score', '-article_id')
+        .values_list('article_id', 'total', 'score')[:size]
+    )
+    return list(rows)
@@ -0,0 +1,302 @@
+"""
+Related articles, precomputed from shared tags.
+
+Every article is a binary vector over the tags and two articles score the
+cosine of their vectors: shared tags / sqrt(tags of one * tags of the other).
+Articles with the same tag set score the same against everyone, so scoring
+runs once per distinct tag set rather than once per pair of articles. The
+scores a set can reach only depend on the shared tags count and the other
+set's length, so they are enumerated best first, and the sets behind each
+score are looked up in an index of the tag subsets (up to SUBSET_SIZE tags)
+of every set: ranking stops at the first buckets that fill a list. The
+RELATED_SIZE best published articles of each published article are stored
+in RelatedArticle, ties going to the most recently published.
+
+`rebuild_related` recomputes every list (`manage.py rebuild_related`).
+`update_related` runs after a commit that changed the tags or the status of
+some articles: their lists are recomputed along with the lists containing
+them, and they enter the lists of their own neighbours where they rank.
+Until the next rebuild, an article can still be missing from a list where
+it ranks but which is not one of its own neighbours, and an entering article
+goes after the listed ones of equal score whatever their dates. Updates run
+in a background thread, out of the request that committed the change; only
+the final delete and insert take the write lock.
+"""
+
+import atexit
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+from itertools import chain, combinations
+from math import sqrt
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+
+from .cache import bump_generation
+from .models import Article, RelatedArticle
+
+logger = logging.getLogger(__name__)
+
+RELATED_SIZE = 10
+# Scores are rounded so that equal scores compare equal and ties go by date
+SCORE_DIGITS = 6
+# Subsets of up to SUBSET_SIZE tags are indexed (6195 for a set of 20 tags),
+# sets sharing more tags are found through any of their SUBSET_SIZE subsets
+SUBSET_SIZE = 4
+
+Neighbour = namedtuple('Neighbour', 'article_id related_id score position')
+
+
+def get_config():
+    config = getattr(settings, 'RELATED_ARTICLES', {})
+    return {
+        'BACKGROUND': config.get('BACKGROUND', True),
+        'RETRY_SECONDS': config.get('RETRY_SECONDS', 60),
+    }
+
+
+class TagSets:
+    """Published articles grouped by tag set, with an index of the subsets of the sets."""
+
+    def __init__(self, rows):
+        # Rows of (article id, tag id), most recently published article first
+        tags = defaultdict(set)
+        for article_id, tag_id in rows:
+            tags[article_id].add(tag_id)
+        self.tags = {article_id: frozenset(tag_ids) for article_id, tag_ids in tags.items()}
+        # Lower is more recently published
+        self.recency = {article_id: index for index, article_id in enumerate(self.tags)}
+        self.articles = defaultdict(list)
+        for article_id, tag_set in self.tags.items():
+            self.articles[tag_set].append(article_id)
+        # Recency of the most recent article of each set
+        self.first = {tag_set: self.recency[articles[0]] for tag_set, articles in self.articles.items()}
+        # (tag subset, set length) -> tag sets containing the subset
+        self.sets_by_subset = defaultdict(list)
+        for tag_set in self.articles:
+            for count in range(1, min(len(tag_set), SUBSET_SIZE) + 1):
+                for subset in combinations(tag_set, count):
+                    self.sets_by_subset[frozenset(subset), len(tag_set)].append(tag_set)
+        self.lengths = sorted({len(tag_set) for tag_set in self.articles})
+        self.ranked_sets = {}
+
+    @classmethod
+    def load(cls, articles=None):
+        """Tag sets of the published articles, only those in `articles` (ids or a subquery) if given."""
+        rows = Article.tags.through.objects.filter(article__status=Article.Status.PUBLISHED)
+        if articles is not None:
+            rows = rows.filter(article_id__in=articles)
+        return cls(
+            rows.order_by('-article__published_at', '-article_id').values_list('article_id', 'tag_id')
+        )
+
+    def sharing(self, tag_set, count, length):
+        """The sets of `length` tags sharing exactly `count` tags with `tag_set`."""
+        found = set()
+        for subset in combinations(tag_set, min(count, SUBSET_SIZE)):
+            for other in self.sets_by_subset.get((frozenset(subset), length), ()):
+                if other not in found and len(other & tag_set) == count:
+                    found.add(other)
+        return found
+
+    def ranked(self, tag_set, size):
+        """(article id, score) of the `size` closest articles to `tag_set`, closest first. Memoized."""
+        key = tag_set, size
+        if key not in self.ranked_sets:
+            self.ranked_sets[key] = self.rank(tag_set, size)
+        return self.ranked_sets[key]
+
+    def rank(self, tag_set, size):
+        # Every (shared tags, other length) pair of each reachable score
+        by_score = defaultdict(list)
+        for length in self.lengths:
+            for count in range(1, min(len(tag_set), length) + 1):
+                by_score[round(count / sqrt(len(tag_set) * length), SCORE_DIGITS)].append((count, length))
+
+        result = []
+        for score in sorted(by_score, reverse=True):
+            sets = set().union(*(self.sharing(tag_set, count, length) for count, length in by_score[score]))
+            if not sets:
+                continue
+            needed = size - len(result)
+            # The `needed` most recent articles of equal score are in the
+            # `needed` sets with the most recent first article
+            others = heapq.nsmallest(needed, sets, key=self.first.__getitem__)
+            candidates = chain.from_iterable(self.articles[other][:needed] for other in others)
+            closest = heapq.nsmallest(needed, candidates, key=self.recency.__getitem__)
+            result += [(article_id, score) for article_id in closest]
+            if len(result) >= size:
+                break
+        return result
+
+    def neighbours(self, article_id, size=RELATED_SIZE):
+        """Neighbour rows of `article_id`, none if it is not a published article with tags."""
+        tag_set = self.tags.get(article_id)
+        if tag_set is None:
+            return []
+        ranked = self.ranked(tag_set, size + 1)
+        closest = [(other, score) for other, score in ranked if other != article_id][:size]
+        return [
+            Neighbour(article_id, other, score, position)
+            for position, (other, score) in enumerate(closest)
+        ]
+
+
+def write_related(rows, article_ids=None):
+    """
+    Replace the lists of `article_ids` (all of them if None) by the Neighbour
+    `rows`, in one transaction.
+    """
+    connection = connections[router.db_for_write(RelatedArticle)]
+    quote = connection.ops.quote_name
+    table = quote(RelatedArticle._meta.db_table)
+    columns = ', '.join(
+        quote(RelatedArticle._meta.get_field(name).column) for name in Neighbour._fields
+    )
+    lists = RelatedArticle.objects.using(connection.alias)
+    if article_ids is not None:
+        lists = lists.filter(article_id__in=article_ids)
+    with transaction.atomic(using=connection.alias):
+        lists.delete()
+        if rows:
+            # One prepared statement rather than bulk_create(), which builds a model per row
+            with connection.cursor() as cursor:
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s)', rows)
+
+
+def rebuild_related(size=RELATED_SIZE):
+    """Recompute every list, returns counts and the duration of each step."""
+    timings = {}
+    start = time.perf_counter()
+    tag_sets = TagSets.load()
+    timings['load_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    rows = [row for article_id in tag_sets.tags for row in tag_sets.neighbours(article_id, size)]
+    timings['score_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    write_related(rows)
+    timings['write_ms'] = (time.perf_counter() - start) * 1000
+    bump_generation()
+    return {'articles': len(tag_sets.tags), 'tag_sets': len(tag_sets.articles), 'rows': len(rows), **timings}
+
+
+def update_related(article_ids, size=RELATED_SIZE):
+    """Recompute the lists affected by a change of tags or status of `article_ids`."""
+    changed = set(article_ids)
+    if not changed:
+        return
+    through = Article.tags.through
+    # Lists holding a changed article hold its old score
+    affected = set(
+        RelatedArticle.objects.filter(related_id__in=changed).values_list('article_id', flat=True)
+    )
+    sources = changed | affected
+    # Every article sharing a tag with a source: all the candidates of the sources
+    tag_ids = through.objects.filter(article_id__in=sources).values('tag_id')
+    tag_sets = TagSets.load(through.objects.filter(tag_id__in=tag_ids).values('article_id'))
+    rows = [row for article_id in sources for row in tag_sets.neighbours(article_id, size)]
+
+    # Cosine is symmetric: a changed article may now rank in the lists of its neighbours
+    entering = defaultdict(list)
+    for row in rows:
+        if row.article_id in changed and row.related_id not in sources:
+            entering[row.related_id].append((row.article_id, row.score))
+    current = defaultdict(list)
+    for article_id, related_id, score in (
+        RelatedArticle.objects.filter(article_id__in=entering)
+        .order_by('article_id', 'position').values_list('article_id', 'related_id', 'score')
+    ):
+        current[article_id].append((related_id, score))
+    rewritten = set()
+    for article_id, candidates in entering.items():
+        # Stable sort: on a tie the article already listed stays first
+        merged = sorted(current[article_id] + candidates, key=itemgetter(1), reverse=True)[:size]
+        if merged != current[article_id]:
+            rewritten.add(article_id)
+            rows += [
+                Neighbour(article_id, other, score, position)
+                for position, (other, score) in enumerate(merged)
+            ]
+
+    # Scored outside the transaction, the write lock is only held to write
+    write_related(rows, sources | rewritten)
+    bump_generation()
+
+
+class RelatedQueue:
+    """Articles waiting for update_related, run by a background thread of this process."""
+
+    def __init__(self):
+        self.reset()
+        # A forked worker starts empty and runs its own thread
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.thread = None
+        self.wake = threading.Event()
+        # Held during an update: the flush at exit waits for the thread's
+        self.updating = threading.Lock()
+
+    def add(self, article_ids):
+        with self.lock:
+            self.pending.update(article_ids)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='related-articles', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+        self.wake.set()
+
+    def run(self):
+        while True:
+            # Woken by add(), or after a while to retry a failed update
+            self.wake.wait(get_config()['RETRY_SECONDS'])
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Related articles update failed')
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Update the pending articles, returns how many. On failure they stay pending."""
+        with self.updating:
+            with self.lock:
+                pending, self.pending = self.pending, set()
+            if not pending:
+                return 0
+            updated = False
+            try:
+                update_related(pending)
+                updated = True
+            except DatabaseError:
+                logger.exception('Could not update the related articles of %d articles, retrying later', len(pending))
+            finally:
+                if not updated:
+                    with self.lock:
+                        self.pending.update(pending)
+            return len(pending) if updated else 0
+
+
+related_queue = RelatedQueue()
+
+
+def schedule_related_update(article_ids, using=None):
+    """
+    Update the related articles of `article_ids` once the current transaction
+    commits, in the background unless RELATED_ARTICLES['BACKGROUND'] is off.
+    """
+    article_ids = list(article_ids)
+    if get_config()['BACKGROUND']:
+        transaction.on_commit(lambda: related_queue.add(article_ids), using=using)
+    else:
+        transaction.on_commit(lambda: update_related(article_ids), using=using)
@@ -0,0 +1,130 @@
+from django.db import connections
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_TABLE = 'articles_article_fts'
+
+# Title matches weigh more than the excerpt, which weighs more than the body
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+_CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, excerpt, content,
+        content='articles_article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+# Triggers live on articles_article: SQLite drops them whenever Django
+# rebuilds that table during a migration, hence the IF NOT EXISTS and the
+# post_migrate hook in apps.py.
+_CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON articles_article BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, excerpt, content)
+        VALUES (new.id, new.title, new.excerpt, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON articles_article BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, excerpt, content)
+        VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au
+    AFTER UPDATE OF title, excerpt, content ON articles_article BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, excerpt, content)
+        VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, excerpt, content)
+        VALUES (new.id, new.title, new.excerpt, new.content);
+    END
+    """,
+]
+
+_available = set()
+
+
+def create_search_index(connection):
+    """Create the FTS5 table and its sync triggers, then index existing articles."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_CREATE_TABLE)
+        for sql in _CREATE_TRIGGERS:
+            cursor.execute(sql)
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', %s)",
+            [f'bm25({weights})'],
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+    _available.discard(connection.alias)
+
+
+def ensure_search_triggers(using='default', **kwargs):
+    """Recreate triggers lost when a migration rebuilt the articles table."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or SEARCH_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for sql in _CREATE_TRIGGERS:
+            cursor.execute(sql)
+
+
+def search_index_available(using):
+    if using in _available:
+        return True
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and SEARCH_TABLE in connection.introspection.table_names():
+        _available.add(using)
+        return True
+    return False
+
+
+def build_match_query(terms):
+    """Turn search terms into an FTS5 query: every term must match, as a prefix."""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the FTS5 index on title, excerpt and content.
+
+    Accents and case are folded by the tokenizer and results are ranked by
+    bm25 unless an explicit `?ordering=` is given. Falls back to the regular
+    SearchFilter when the index does not exist (other databases).
+    """
+
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not search_index_available(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        match = build_match_query(search_terms)
+        table = queryset.model._meta.db_table
+        # Joining the index lets SQLite run the MATCH once and read the bm25
+        # rank (configured with SEARCH_WEIGHTS) in the same pass, which no ORM
+        # lookup can express. The unary + keeps the rowid out of the index
+        # constraints: otherwise, without ANALYZE stats, SQLite may drive the
+        # join from an article index and re-run the MATCH for every row.
+        queryset = queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'+{SEARCH_TABLE}.rowid = "{table}"."id"', f'{SEARCH_TABLE} MATCH %s'],
+            params=[match],
+            select={'search_rank': f'{SEARCH_TABLE}.rank'},
+        )
+        if request.query_params.get(self.ordering_param):
+            return queryset
+        return queryset.order_by('search_rank', '-pk')
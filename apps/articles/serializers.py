@@ -1,8 +1,74 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Max
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from apps.users.serializers import UserMinimalSerializer
 
-from .models import Article, Category, Comment, Tag
+from .models import COMMENT_MAX_DEPTH, Article, Category, Comment, Tag
+
+
+def build_comment_tree(comments):
+    """Split a flat list of comments into root comments and a parent id → replies map."""
+    roots = []
+    children = defaultdict(list)
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        else:
+            children[comment.parent_id].append(comment)
+    return roots, children
+
+
+class PrimaryKeysField(serializers.ManyRelatedField):
+    """
+    many=True side of BulkPrimaryKeyRelatedField: every pk is checked with a
+    single IN query and all unknown pks are reported together.
+    """
+
+    default_error_messages = {
+        'does_not_exist': 'Clés primaires non valides, objets inexistants : {pk_values}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for item in data:
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+        pks = list(dict.fromkeys(pks))
+
+        instances = queryset.in_bulk(pks) if pks else {}
+        missing = [pk for pk in pks if pk not in instances]
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(str(pk) for pk in missing))
+        return [instances[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField whose many=True version validates in one query."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return PrimaryKeysField(**list_kwargs)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -40,11 +106,14 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['author', 'created_at', 'updated_at']
 
     def get_replies(self, obj):
-        # Only get replies for root comments (parent=None)
-        if obj.parent is None:
-            replies = obj.replies.all()
-            return CommentSerializer(replies, many=True).data
-        return []
+        # Replies come from the prefetched tree when the view provides one,
+        # otherwise fall back to one query per comment.
+        children = self.context.get('comment_children')
+        if children is None:
+            replies = obj.replies.select_related('author', 'author__profile')
+        else:
+            replies = children.get(obj.id, [])
+        return CommentSerializer(replies, many=True, context=self.context).data
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -59,6 +128,21 @@ class CommentCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Le commentaire parent doit appartenir au même article."
             )
+        if value is None:
+            return value
+        comment = self.instance
+        height = 0
+        if comment is not None and comment.path:
+            if value.path.startswith(comment.path):
+                raise serializers.ValidationError(
+                    "Un commentaire ne peut pas répondre à l'une de ses propres réponses."
+                )
+            # Its replies move down along with it
+            height = Comment.objects.subtree(comment).aggregate(deepest=Max('depth'))['deepest'] - comment.depth
+        if value.depth + 1 + height > COMMENT_MAX_DEPTH:
+            raise serializers.ValidationError(
+                f"Les réponses ne peuvent pas dépasser {COMMENT_MAX_DEPTH} niveaux."
+            )
         return value
 
 
@@ -98,15 +182,18 @@ class ArticleDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_comments(self, obj):
-        # Only root comments (replies are nested inside)
-        root_comments = obj.comments.filter(parent=None)
-        return CommentSerializer(root_comments, many=True).data
+        # Whole thread in one query (prefetched by the views), replies are
+        # nested in memory
+        comments = obj.comments.all()
+        root_comments, children = build_comment_tree(comments)
+        context = {**self.context, 'comment_children': children}
+        return CommentSerializer(root_comments, many=True, context=context).data
 
 
 class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating articles."""
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
         required=False
@@ -127,7 +214,7 @@ class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         article = Article.objects.create(**validated_data)
-        article.tags.set(tags)
+        article.set_tags(tags, current_ids=())
         return article
 
     def update(self, instance, validated_data):
@@ -136,5 +223,5 @@ class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         if tags is not None:
-            instance.tags.set(tags)
+            instance.set_tags(tags)
         return instance
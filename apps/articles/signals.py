@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.models import Profile
+
+from .cache import bump_generation, invalidate_article_ref
+from .models import Article, Category, Comment, Tag
+from .related import schedule_related_update
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, raw=False, **kwargs):
+    """Count a new comment on its article."""
+    if created and not raw:
+        Article.objects.filter(pk=instance.article_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    """Uncount a deleted comment, replies removed by cascade included."""
+    Article.objects.filter(pk=instance.article_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1
+    )
+
+
+@receiver([post_save, post_delete], sender=Article)
+def invalidate_article_ref_cache(sender, instance, **kwargs):
+    """Drop the cached (id, status, author_id) of the article, under its old slug too when renamed."""
+    invalidate_article_ref(instance.slug, getattr(instance, '_loaded_slug', None))
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_related_on_tags_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Recompute the related articles of the articles whose tags changed, once committed."""
+    if reverse and action == 'pre_clear':
+        # tag.articles.clear(): the articles are only known before
+        instance._cleared_article_ids = list(instance.articles.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        article_ids = [instance.pk]
+    elif action == 'post_clear':
+        article_ids = instance.__dict__.pop('_cleared_article_ids', [])
+    else:
+        article_ids = pk_set
+    schedule_related_update(article_ids, using)
+
+
+@receiver(post_save, sender=Article)
+def update_related_on_status_change(sender, instance, created, raw=False, using=None, **kwargs):
+    """A published or unpublished article enters or leaves the related lists."""
+    if created or raw:
+        return
+    if instance.status != getattr(instance, '_loaded_status', instance.status):
+        schedule_related_update([instance.pk], using)
+
+
+@receiver([post_save, post_delete], sender=Article)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Category)
+@receiver(m2m_changed, sender=Article.tags.through)
+def invalidate_response_cache(sender, **kwargs):
+    """Any write to the blog content invalidates the cached API responses."""
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        bump_generation()
+
+
+# Fields of the authors shown in the article and comment bodies
+SHOWN_FIELDS = {
+    User: {'username', 'first_name', 'last_name'},
+    Profile: {'avatar_url'},
+}
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_response_cache_on_author_change(sender, created=False, update_fields=None, **kwargs):
+    """Authors are shown in the cached responses, logins and new users do not change them."""
+    if created or (update_fields is not None and not SHOWN_FIELDS[sender] & set(update_fields)):
+        return
+    bump_generation()
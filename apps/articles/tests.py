@@ -0,0 +1,375 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .fast_serializers import ArticleListRowSerializer, CommentRowSerializer
+from .management.commands.check_query_plans import get_queries, is_full_scan, plan_endpoints, query_plan
+from .management.commands.check_write_queries import CREATE_BUDGET, UPDATE_BUDGET
+from .models import Article, ArticleViewCount, Category, Comment, Tag
+from .popularity import ViewBuffer, current_hour
+from .related import rebuild_related
+from .serializers import ArticleCreateUpdateSerializer, ArticleListSerializer, CommentSerializer, build_comment_tree
+
+# Savepoint, article check, upsert, retention delete, release: ARTICLE_VIEWS
+# BACKGROUND is off under tests, a retrieve writes its view itself
+VIEW_WRITE_QUERIES = 5
+
+
+class ArticleFixtures:
+    """A few published articles sharing tags, a draft, a comment thread, views and related lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='grimpe-admin', is_staff=True)
+        cls.member = User.objects.create_user('membre', password='grimpe-membre')
+        cls.author = User.objects.create_user('auteur', password='grimpe-auteur', first_name='Lucie')
+        cls.category = Category.objects.create(name='Bloc')
+        cls.tags = [
+            Tag.objects.create(name=name) for name in ('Fontainebleau', 'Technique', 'Sécurité', 'Matériel')
+        ]
+        now = timezone.now()
+        cls.articles = []
+        for index in range(6):
+            article = Article.objects.create(
+                title=f'Escalade {index}',
+                excerpt='Un résumé',
+                content="Une journée d'escalade en bloc",
+                author=cls.author,
+                category=cls.category,
+                status=Article.Status.PUBLISHED,
+                published_at=now - timedelta(days=index),
+            )
+            article.tags.set(cls.tags[index % 3:index % 3 + 2])
+            cls.articles.append(article)
+        cls.article = cls.articles[0]
+        cls.draft = Article.objects.create(
+            title='Brouillon', excerpt='Pas fini', content='À relire', author=cls.author,
+        )
+        cls.thread = Comment.objects.create(article=cls.article, author=cls.member, content='Superbe voie')
+        Comment.objects.create(article=cls.article, author=cls.author, content='Merci !', parent=cls.thread)
+        ArticleViewCount.objects.create(article=cls.article, hour=current_hour(), views=3)
+        rebuild_related()
+
+
+class QueryPlanTests(ArticleFixtures, TestCase):
+    """The `manage.py check_query_plans` endpoints, on their own data."""
+
+    def test_no_full_table_scan(self):
+        for user, url in plan_endpoints(self.article, self.member, self.staff, self.thread):
+            with self.subTest(url=url, user=user and user.username):
+                response, captured = get_queries(self.client, user, url)
+                self.assertEqual(response.status_code, 200)
+                scans = [
+                    (query['sql'], step)
+                    for query in captured
+                    for step in query_plan(query['sql'])
+                    if is_full_scan(step)
+                ]
+                self.assertEqual(scans, [])
+
+
+class QueryCountTests(ArticleFixtures, TestCase):
+    """The article and comment reads run a fixed number of queries, whatever the number of comments."""
+
+    def setUp(self):
+        self.clear_caches()
+
+    def clear_caches(self):
+        # Anonymous responses and article references are cached
+        for cache in caches.all():
+            cache.clear()
+
+    def add_replies(self, count):
+        """A reply chain of `count` comments under the thread, plus as many new threads."""
+        parent = self.thread
+        for index in range(count):
+            parent = Comment.objects.create(article=self.article, author=self.member, content='Re', parent=parent)
+            Comment.objects.create(article=self.article, author=self.staff, content=f'Fil {index}')
+        self.clear_caches()
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_article_list(self):
+        # Count, rows, tags
+        self.get('/api/articles/', 3)
+
+    def test_article_detail(self):
+        # Article, tags, comments with their authors, article reference of the view counter
+        url = f'/api/articles/{self.article.slug}/'
+        self.get(url, 4 + VIEW_WRITE_QUERIES)
+        self.add_replies(5)
+        response = self.get(url, 4 + VIEW_WRITE_QUERIES)
+        self.assertEqual(len(response.json()['comments']), 6)
+
+    def test_comment_list(self):
+        # Article reference, the whole comment tree for the replies, count, page
+        url = f'/api/articles/{self.article.slug}/comments/'
+        self.get(url, 4)
+        self.add_replies(5)
+        self.get(url, 4)
+
+    def test_cached_article_detail(self):
+        url = f'/api/articles/{self.article.slug}/'
+        self.get(url, 4 + VIEW_WRITE_QUERIES)
+        self.get(url, VIEW_WRITE_QUERIES)
+
+
+
+class ConditionalGetTests(ArticleFixtures, TestCase):
+    """ETag and Last-Modified answer 304 without a query until a write, or the end of the cache timeout."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.first = self.client.get('/api/articles/')
+
+    def assertValidates(self, status, **headers):
+        response = self.client.get('/api/articles/', **headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_not_modified_without_query(self):
+        with self.assertNumQueries(0):
+            self.assertValidates(304, HTTP_IF_NONE_MATCH=self.first['ETag'])
+        with self.assertNumQueries(0):
+            self.assertValidates(304, HTTP_IF_MODIFIED_SINCE=self.first['Last-Modified'])
+
+    def test_write(self):
+        later = time.time() + 2
+        with mock.patch('time.time', return_value=later):
+            self.category.name = 'Bloc et traversées'
+            self.category.save()
+        self.assertValidates(200, HTTP_IF_NONE_MATCH=self.first['ETag'])
+        response = self.assertValidates(200, HTTP_IF_MODIFIED_SINCE=self.first['Last-Modified'])
+        self.assertEqual(response['Last-Modified'], http_date(int(later)))
+
+    def test_timeout(self):
+        later = time.time() + settings.RESPONSE_CACHE_TIMEOUT
+        with mock.patch('time.time', return_value=later):
+            self.assertValidates(200, HTTP_IF_NONE_MATCH=self.first['ETag'])
+            self.assertValidates(200, HTTP_IF_MODIFIED_SINCE=self.first['Last-Modified'])
+
+
+class ThreadedCursorTests(ArticleFixtures, TestCase):
+    """Cursor pages of a thread or of the first levels walk the whole listing in thread order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Several pages: replies at several depths and other threads
+        parent = cls.thread
+        for index in range(12):
+            reply = Comment.objects.create(article=cls.article, author=cls.member, content=f'Re {index}', parent=parent)
+            Comment.objects.create(article=cls.article, author=cls.staff, content=f'À côté {index}', parent=reply)
+            if index % 3 == 0:
+                parent = reply
+            Comment.objects.create(article=cls.article, author=cls.author, content=f'Fil {index}')
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def walk(self, url):
+        """Ids of every comment listed from `url`, following the next links, top level only."""
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids += [comment['id'] for comment in body['results']]
+            url = body['next']
+            pages += 1
+        self.assertGreater(pages, 1)
+        return ids
+
+    def test_thread(self):
+        ids = self.walk(f'/api/articles/{self.article.slug}/comments/?thread={self.thread.pk}&pagination=cursor')
+        expected = Comment.objects.subtree(self.thread).threaded().values_list('pk', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_depth(self):
+        ids = self.walk(f'/api/articles/{self.article.slug}/comments/?depth=1&pagination=cursor')
+        expected = Comment.objects.filter(article=self.article, depth__lte=1).threaded().values_list('pk', flat=True)
+        self.assertEqual(ids, list(expected))
+
+
+class SearchCursorTests(ArticleFixtures, TestCase):
+    """Search results ranked by relevance cannot be paged by cursor, the other orderings can."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def test_ranked_search_refused(self):
+        response = self.client.get('/api/articles/?search=escalade&pagination=cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pagination', response.json())
+
+    def test_ordered_search(self):
+        response = self.client.get('/api/articles/?search=escalade&ordering=-published_at&pagination=cursor')
+        self.assertEqual(response.status_code, 200)
+        expected = [article.title for article in self.articles]
+        self.assertEqual([article['title'] for article in response.json()['results']], expected)
+
+
+class ViewBufferTests(ArticleFixtures, TestCase):
+    """Views are written by the request without a thread, and never pile up past MAX_PENDING."""
+
+    def setUp(self):
+        self.buffer = ViewBuffer()
+
+    def views(self, article):
+        return sum(ArticleViewCount.objects.filter(article=article).values_list('views', flat=True))
+
+    def test_written_without_thread(self):
+        before = self.views(self.article)
+        self.buffer.add(self.article.pk)
+        self.assertIsNone(self.buffer.thread)
+        self.assertEqual(self.buffer.pending, {})
+        self.assertEqual(self.views(self.article), before + 1)
+
+    @override_settings(ARTICLE_VIEWS={'BACKGROUND': False, 'MAX_PENDING': 3})
+    def test_capped_while_writes_fail(self):
+        with mock.patch('apps.articles.popularity.write_views', side_effect=DatabaseError('database is locked')):
+            with self.assertLogs('apps.articles.popularity') as logs:
+                for article in self.articles:
+                    self.buffer.add(article.pk)
+                    self.buffer.add(self.article.pk)
+        self.assertEqual(len(self.buffer.pending), 3)
+        # The most viewed article is kept
+        self.assertEqual(self.buffer.pending[self.article.pk, current_hour()], 7)
+        self.assertTrue(any('views dropped' in line for line in logs.output))
+        self.buffer.flush()
+        self.assertEqual(self.buffer.pending, {})
+
+
+class RowSerializerParityTests(ArticleFixtures, TestCase):
+    """The row serializers render byte for byte like the DRF serializers they replace."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        profile = cls.author.profile
+        profile.avatar_url = 'https://example.com/lucie.png'
+        profile.save()
+        # No category, no tag, no published_at, a cover image
+        Article.objects.create(
+            title='Sans catégorie', excerpt='', content='...', author=cls.member,
+            image_url='https://example.com/cover.jpg',
+        )
+        reply = Comment.objects.create(article=cls.article, author=cls.staff, content='Et la cotation ?', parent=cls.thread)
+        Comment.objects.create(article=cls.article, author=cls.member, content='6a', parent=reply)
+        Comment.objects.create(article=cls.article, author=cls.staff, content='Un autre fil')
+
+    def assertRendersLike(self, actual, expected):
+        render = JSONRenderer().render
+        self.assertEqual([render(row).decode() for row in actual], [render(row).decode() for row in expected])
+
+    def test_article_list(self):
+        articles = (
+            Article.objects.select_related('author', 'author__profile', 'category')
+            .prefetch_related('tags').order_by('-published_at', '-pk')
+        )
+        row_serializer = ArticleListRowSerializer()
+        self.assertRendersLike(
+            row_serializer.serialize(list(row_serializer.get_rows_queryset(articles))),
+            ArticleListSerializer(list(articles), many=True).data,
+        )
+
+    def test_comment_list(self):
+        comments = Comment.objects.filter(article=self.article).select_related('author', 'author__profile')
+        _, children = build_comment_tree(comments)
+        page = comments.order_by('-created_at')
+        row_serializer = CommentRowSerializer(Comment.objects.filter(article=self.article))
+        self.assertRendersLike(
+            row_serializer.serialize(list(row_serializer.get_rows_queryset(page))),
+            CommentSerializer(list(page), many=True, context={'comment_children': children}).data,
+        )
+
+    def test_list_endpoint(self):
+        response = self.client.get('/api/articles/')
+        articles = (
+            Article.objects.filter(status=Article.Status.PUBLISHED)
+            .select_related('author', 'author__profile', 'category')
+            .prefetch_related('tags').order_by('-published_at')
+        )
+        self.assertRendersLike(response.json()['results'], ArticleListSerializer(list(articles[:10]), many=True).data)
+
+
+class TagValidationQueryTests(ArticleFixtures, TestCase):
+    """Sent tags are validated in one query and article writes do not grow with their number."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tag_ids = [tag.pk for tag in cls.tags] + [
+            Tag.objects.create(name=f'Secteur {index}').pk for index in range(36)
+        ]
+
+    def setUp(self):
+        # The first authenticated request of a test would also load the user
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.author)}'}
+        self.client.get('/api/articles/', **self.headers)
+
+    def validate(self, tags):
+        serializer = ArticleCreateUpdateSerializer(data={
+            'title': 'Nouvelle voie', 'excerpt': 'Résumé', 'content': 'Contenu', 'tags': tags,
+        })
+        with self.assertNumQueries(1):
+            serializer.is_valid()
+        return serializer
+
+    def test_one_query_whatever_the_number_of_tags(self):
+        for count in (1, 20, 40):
+            with self.subTest(tags=count):
+                self.assertTrue(self.validate(self.tag_ids[:count]).is_valid())
+
+    def test_unknown_tags_reported_together(self):
+        missing = [max(self.tag_ids) + 1000, max(self.tag_ids) + 1001]
+        serializer = self.validate(self.tag_ids[:2] + missing)
+        self.assertFalse(serializer.is_valid())
+        message = str(serializer.errors['tags'])
+        for pk in missing:
+            self.assertIn(str(pk), message)
+
+    def write_queries(self, tags, new_tags):
+        """Queries of the create with `tags`, then of the update to `new_tags`."""
+        data = {'title': 'Nouvelle voie', 'excerpt': 'Résumé', 'content': 'Contenu', 'tags': tags}
+        with CaptureQueriesContext(connection) as create:
+            response = self.client.post('/api/articles/', data, content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 201)
+        slug = Article.objects.order_by('-pk').values_list('slug', flat=True).first()
+        with CaptureQueriesContext(connection) as update:
+            response = self.client.patch(
+                f'/api/articles/{slug}/', {'tags': new_tags}, content_type='application/json', **self.headers,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(Article.objects.get(slug=slug).tags.values_list('pk', flat=True)), set(new_tags),
+        )
+        return len(create), len(update)
+
+    def test_writes_do_not_grow_with_the_number_of_tags(self):
+        # The update swaps every tag for another one
+        few = self.write_queries(self.tag_ids[:1], self.tag_ids[20:21])
+        many = self.write_queries(self.tag_ids[:20], self.tag_ids[20:40])
+        self.assertEqual(many, few)
+        create, update = many
+        self.assertLessEqual(create, CREATE_BUDGET)
+        self.assertLessEqual(update, UPDATE_BUDGET)
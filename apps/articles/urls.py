@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import ArticleViewSet, CategoryViewSet, CommentViewSet, TagViewSet
+from .async_views import AsyncArticleView, AsyncCategoryView, AsyncCommentView, AsyncTagView
+from .views import ArticleViewSet, CacheStatsView, CategoryViewSet, CommentViewSet, TagViewSet
 
 router = DefaultRouter()
 router.register('articles', ArticleViewSet, basename='article')
@@ -10,15 +11,38 @@ router.register('tags', TagViewSet, basename='tag')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     # Nested comments under articles
     path(
         'articles/<slug:article_slug>/comments/',
         CommentViewSet.as_view({'get': 'list', 'post': 'create'}),
         name='article-comments'
     ),
+    path(
+        'articles/<slug:article_slug>/comments/threads/',
+        CommentViewSet.as_view({'get': 'threads'}),
+        name='article-comment-threads'
+    ),
     path(
         'articles/<slug:article_slug>/comments/<int:pk>/',
         CommentViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}),
         name='article-comment-detail'
     ),
+    # Async read-only versions of the endpoints above, for ASGI deployments
+    path('async/articles/', AsyncArticleView.as_view(), name='async-article-list'),
+    path('async/articles/<slug:slug>/', AsyncArticleView.as_view(), name='async-article-detail'),
+    path(
+        'async/articles/<slug:article_slug>/comments/',
+        AsyncCommentView.as_view(),
+        name='async-article-comments'
+    ),
+    path(
+        'async/articles/<slug:article_slug>/comments/<int:pk>/',
+        AsyncCommentView.as_view(),
+        name='async-article-comment-detail'
+    ),
+    path('async/categories/', AsyncCategoryView.as_view(), name='async-category-list'),
+    path('async/categories/<slug:slug>/', AsyncCategoryView.as_view(), name='async-category-detail'),
+    path('async/tags/', AsyncTagView.as_view(), name='async-tag-list'),
+    path('async/tags/<slug:slug>/', AsyncTagView.as_view(), name='async-tag-detail'),
 ]
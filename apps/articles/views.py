@@ -1,11 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
-from django.db.models import Count
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from apps.core.replicas import read_from_primary
+
+from .cache import CachedResponseMixin, cache_stats, facets_cache_key, resolve_article, trending_cache_key
+from .conditional import ConditionalGetMixin
+from .export import export_queryset, iter_ndjson, parse_updated_since
+from .facets import compute_facets, facets_signature
+from .fast_serializers import ArticleListRowSerializer, CommentRowSerializer, RowListMixin
+from .importer import IMPORT_MAX_ARTICLES, NDJSONParser, import_articles, validate_import
 from .models import Article, Category, Comment, Tag
+from .pagination import OptionalCursorPagination
+from .popularity import get_config as views_config, record_view, trending_articles
+from .purge import purge_articles
+from .search import FullTextSearchFilter
 from .serializers import (
     ArticleCreateUpdateSerializer,
     ArticleDetailSerializer,
@@ -14,12 +33,14 @@ from .serializers import (
     CommentCreateSerializer,
     CommentSerializer,
     TagSerializer,
+    build_comment_tree,
 )
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing categories."""
 
+    cache_authenticated = True
     serializer_class = CategorySerializer
     lookup_field = 'slug'
 
@@ -29,19 +50,22 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         ).order_by('name')
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing tags."""
 
+    cache_authenticated = True
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     lookup_field = 'slug'
 
 
-class ArticleViewSet(viewsets.ModelViewSet):
-    """ViewSet for articles with full CRUD."""
+class ArticleViewSet(ConditionalGetMixin, CachedResponseMixin, RowListMixin, viewsets.ModelViewSet):
+    """ViewSet for articles with full CRUD, conditional GETs and cached anonymous reads."""
 
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = OptionalCursorPagination
+    # Search runs last so its bm25 ranking can replace the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category__slug', 'status', 'author__username']
     search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['created_at', 'published_at', 'title']
@@ -50,9 +74,11 @@ class ArticleViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Article.objects.select_related(
             'author', 'author__profile', 'category'
-        ).prefetch_related('tags').annotate(
-            comments_count=Count('comments')
-        )
+        ).prefetch_related('tags')
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(Prefetch(
+                'comments', queryset=Comment.objects.select_related('author', 'author__profile')
+            ))
 
         # Non-authenticated users only see published articles
         if not self.request.user.is_authenticated:
@@ -65,6 +91,9 @@ class ArticleViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_row_serializer(self):
+        return ArticleListRowSerializer()
+
     def get_serializer_class(self):
         if self.action == 'list':
             return ArticleListSerializer
@@ -73,36 +102,204 @@ class ArticleViewSet(viewsets.ModelViewSet):
         return ArticleDetailSerializer
 
     def get_permissions(self):
+        if self.action == 'bulk_import':
+            return [permissions.IsAdminUser()]
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # A 304 is a view too, served from the client's cache
+        if response.status_code in (200, 304):
+            ref = resolve_article(kwargs[self.lookup_url_kwarg or self.lookup_field])
+            if ref is not None:
+                record_view(ref.id)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Most viewed published articles of the last `?days=` days, recent views
+        weighing more (see apps.articles.popularity). Views still buffered by
+        the workers are not counted yet.
+        """
+        config = views_config()
+        days = request.query_params.get('days', config['TRENDING_DAYS'])
+        try:
+            days = int(days)
+        except (TypeError, ValueError):
+            days = 0
+        if not 1 <= days <= config['RETENTION_DAYS']:
+            raise ValidationError({'days': f"Nombre de jours entre 1 et {config['RETENTION_DAYS']} attendu."})
+
+        key = trending_cache_key(days)
+        data = cache.get(key)
+        if data is None:
+            read_from_primary()
+            ranked = trending_articles(days)
+            serializer = ArticleListRowSerializer()
+            rows = {
+                row.pk: row
+                for row in serializer.get_rows_queryset(Article.objects.filter(pk__in=[pk for pk, _, _ in ranked]))
+            }
+            ranked = [entry for entry in ranked if entry[0] in rows]
+            data = serializer.serialize([rows[pk] for pk, _, _ in ranked])
+            for article, (_, views, score) in zip(data, ranked):
+                article['views'] = views
+                article['trending_score'] = round(score, 3)
+            # Views keep coming without bumping the generation
+            cache.set(key, data, config['FLUSH_SECONDS'])
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Article counts per category, tag, status, author and month for the list
+        filters of the request (`?category__slug=`, `?search=`...). Cached
+        per filter set until the next write.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        key = facets_cache_key(facets_signature(request, [*self.filterset_fields, FullTextSearchFilter.search_param]))
+        data = cache.get(key)
+        if data is None:
+            # Facets computed on a lagging replica would outlive the lag
+            read_from_primary()
+            data = compute_facets(queryset)
+            cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, slug=None):
+        """The closest published articles by shared tags, precomputed by apps.articles.related."""
+        return self.cached_response(self.related_articles, request, slug=slug)
+
+    def related_articles(self, request, slug):
+        ref = resolve_article(slug)
+        user = request.user
+        if ref is None or not (
+            ref.status == Article.Status.PUBLISHED or user.is_staff or ref.author_id == user.pk
+        ):
+            raise NotFound("Cet article n'existe pas.")
+        articles = Article.objects.filter(
+            neighbour_of__article_id=ref.id, status=Article.Status.PUBLISHED
+        ).order_by('neighbour_of__position')
+        serializer = ArticleListRowSerializer()
+        return Response(serializer.serialize(serializer.get_rows_queryset(articles)))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every visible article as NDJSON (one JSON object per line),
+        oldest change first. `?updated_since=<ISO date>` only returns the
+        articles changed after that moment, for incremental pulls.
+        """
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = parse_updated_since(updated_since)
+            except ValueError:
+                raise ValidationError({'updated_since': 'Date invalide, format ISO 8601 attendu.'})
+        queryset = export_queryset(self.filter_queryset(self.get_queryset()), updated_since or None)
+        return StreamingHttpResponse(iter_ndjson(queryset), content_type='application/x-ndjson')
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[JSONParser, NDJSONParser])
+    def bulk_import(self, request):
+        """
+        Create many articles at once from a JSON array or NDJSON, authored by
+        the current user. Nothing is created if any article is invalid.
+        """
+        articles, errors = validate_import(request.data, max_length=IMPORT_MAX_ARTICLES)
+        if errors:
+            raise ValidationError(errors)
+        created = import_articles(articles, request.user)
+        return Response(
+            {'created': len(created), 'slugs': [article.slug for article in created]},
+            status=status.HTTP_201_CREATED,
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     def perform_update(self, serializer):
         # Only author or staff can update
-        if self.get_object().author != self.request.user and not self.request.user.is_staff:
-            raise permissions.PermissionDenied("Vous ne pouvez modifier que vos propres articles.")
+        if serializer.instance.author_id != self.request.user.pk and not self.request.user.is_staff:
+            raise PermissionDenied("Vous ne pouvez modifier que vos propres articles.")
         serializer.save()
 
     def perform_destroy(self, instance):
         # Only author or staff can delete
-        if instance.author != self.request.user and not self.request.user.is_staff:
-            raise permissions.PermissionDenied("Vous ne pouvez supprimer que vos propres articles.")
-        instance.delete()
+        if instance.author_id != self.request.user.pk and not self.request.user.is_staff:
+            raise PermissionDenied("Vous ne pouvez supprimer que vos propres articles.")
+        # Comments, replies and tag links deleted in a few statements, not loaded
+        purge_articles(Article.objects.filter(pk=instance.pk))
+
+
+class CacheStatsView(APIView):
+    """Response cache hit/miss counters (admin only)."""
+
+    permission_classes = [permissions.IsAdminUser]
 
+    def get(self, request):
+        return Response(cache_stats())
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(RowListMixin, viewsets.ModelViewSet):
     """ViewSet for comments on an article."""
 
     serializer_class = CommentSerializer
+    pagination_class = OptionalCursorPagination
+
+    @cached_property
+    def article_ref(self):
+        """(id, status, author_id) of the article in the URL, resolved once per request."""
+        return resolve_article(self.kwargs.get('article_slug'))
+
+    @property
+    def article_id(self):
+        # No article: filtering on NULL keeps listing an empty page
+        return self.article_ref.id if self.article_ref else None
+
+    @property
+    def threaded(self):
+        """Whether the list asks for a thread or a depth, and so comes in thread order."""
+        params = self.request.query_params
+        return self.action == 'list' and ('thread' in params or 'depth' in params)
+
+    @cached_property
+    def thread_comments(self):
+        """
+        The comments listed and nested: every comment of the article, or of
+        the `?thread=` subtree, down to `?depth=` levels (0 for the roots or
+        the thread's first comment only). One range of the path index.
+        """
+        comments = Comment.objects.filter(article_id=self.article_id)
+        if not self.threaded:
+            return comments
+        params = self.request.query_params
+        depth = None
+        if 'depth' in params:
+            try:
+                depth = int(params['depth'])
+                if depth < 0:
+                    raise ValueError
+            except ValueError:
+                raise ValidationError({'depth': "Profondeur entière positive ou nulle attendue."})
+        if 'thread' not in params:
+            return comments if depth is None else comments.filter(depth__lte=depth)
+        try:
+            root = comments.only('article_id', 'path', 'depth').get(pk=int(params['thread']))
+        except (ValueError, Comment.DoesNotExist):
+            raise NotFound("Ce commentaire n'existe pas.")
+        return comments.subtree(root, depth)
 
     def get_queryset(self):
-        article_slug = self.kwargs.get('article_slug')
-        return Comment.objects.filter(
-            article__slug=article_slug
-        ).select_related('author', 'author__profile').order_by('-created_at')
+        queryset = self.thread_comments.select_related('author', 'author__profile')
+        return queryset.threaded() if self.threaded else queryset.order_by('-created_at')
+
+    def get_row_serializer(self):
+        # The whole thread in one query, for the nested replies
+        return CommentRowSerializer(self.thread_comments)
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -116,25 +313,32 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        article_slug = self.kwargs.get('article_slug')
-        try:
-            article = Article.objects.get(slug=article_slug)
-            context['article_id'] = article.id
-        except Article.DoesNotExist:
-            pass
+        if self.action in ['list', 'retrieve']:
+            # Load the article's comment tree once so nested replies cost no extra query
+            _, children = build_comment_tree(self.thread_comments.select_related('author', 'author__profile'))
+            context['comment_children'] = children
+        if self.article_ref is not None:
+            context['article_id'] = self.article_ref.id
         return context
 
+    def threads(self, request, *args, **kwargs):
+        """Root comments in thread order, with their replies at any depth."""
+        if self.article_ref is None:
+            raise NotFound("Cet article n'existe pas.")
+        counts = Comment.objects.filter(article_id=self.article_id).reply_counts()
+        return Response([{'id': pk, 'replies_count': replies} for pk, replies in counts.items()])
+
     def perform_create(self, serializer):
-        article_slug = self.kwargs.get('article_slug')
-        article = Article.objects.get(slug=article_slug)
-        serializer.save(author=self.request.user, article=article)
+        if self.article_ref is None:
+            raise NotFound("Cet article n'existe pas.")
+        serializer.save(author=self.request.user, article_id=self.article_ref.id)
 
     def perform_update(self, serializer):
-        if self.get_object().author != self.request.user and not self.request.user.is_staff:
-            raise permissions.PermissionDenied("Vous ne pouvez modifier que vos propres commentaires.")
+        if serializer.instance.author_id != self.request.user.pk and not self.request.user.is_staff:
+            raise PermissionDenied("Vous ne pouvez modifier que vos propres commentaires.")
         serializer.save()
 
     def perform_destroy(self, instance):
         if instance.author != self.request.user and not self.request.user.is_staff:
-            raise permissions.PermissionDenied("Vous ne pouvez supprimer que vos propres commentaires.")
+            raise PermissionDenied("Vous ne pouvez supprimer que vos propres commentaires.")
         instance.delete()
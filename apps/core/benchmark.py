@@ -0,0 +1,84 @@
+import io
+import math
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(timings_ms):
+    return {
+        'count': len(timings_ms),
+        'mean_ms': round(sum(timings_ms) / len(timings_ms), 3) if timings_ms else None,
+        'p50_ms': round(percentile(timings_ms, 50), 3) if timings_ms else None,
+        'p95_ms': round(percentile(timings_ms, 95), 3) if timings_ms else None,
+        'p99_ms': round(percentile(timings_ms, 99), 3) if timings_ms else None,
+    }
+
+
+class QueryRecorder:
+    """Count and time SQL statements on every connection through execute wrappers."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+@contextmanager
+def benchmark_database(articles, comments_per_article, seed, existing_db=False):
+    """
+    Run the block against a freshly created and seeded test database, or
+    against the configured one with `existing_db`. Views are written in the
+    request that counts them, no flush thread runs behind the timings, and
+    PerformanceMiddleware is off: its wrappers and slow request log are not
+    what is measured.
+    """
+    setup_test_environment(debug=False)
+    old_name = None
+    overrides = override_settings(
+        ARTICLE_VIEWS={**settings.ARTICLE_VIEWS, 'BACKGROUND': False},
+        PERFORMANCE_MONITORING={**settings.PERFORMANCE_MONITORING, 'ENABLED': False},
+    )
+    overrides.enable()
+    try:
+        if not existing_db:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            call_command(
+                'seed', articles=articles, comments_per_article=comments_per_article,
+                seed=seed, workers=1, stdout=io.StringIO(),
+            )
+        yield
+    finally:
+        if old_name is not None:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        overrides.disable()
+        teardown_test_environment()
@@ -0,0 +1,151 @@
+import json
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.articles.models import Article, Category
+from apps.core.benchmark import QueryRecorder, benchmark_database, summarize
+
+
+class Command(BaseCommand):
+    help = 'Replay a request mix in-process against the API and report latency percentiles and SQL cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=1000, help='Articles to seed in the benchmark database')
+        parser.add_argument('--comments-per-article', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and request order')
+        parser.add_argument(
+            '--existing-db', action='store_true',
+            help='Run against the configured database instead of a freshly seeded test database',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Clear the cache before every request so anonymous reads hit the database',
+        )
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run these endpoints')
+        parser.add_argument(
+            '--output', default=None,
+            help='JSON results file (default: bench_results/api-<timestamp>.json)',
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database(
+            options['articles'], options['comments_per_article'], options['seed'], options['existing_db']
+        ):
+            results = self.run_mix(options)
+        self.write_results(results, options)
+
+    def build_mix(self, rng):
+        slugs = list(
+            Article.objects.filter(status='published').values_list('slug', flat=True)[:500]
+        )
+        if not slugs:
+            raise CommandError('No published article to benchmark, seed the database first.')
+        category = Category.objects.order_by('pk').first()
+        user = User.objects.filter(is_staff=False).order_by('pk').first()
+        token = f'Bearer {AccessToken.for_user(user)}' if user else None
+
+        mix = {
+            'article-list': lambda: ('/api/articles/', None),
+            'article-list-page-5': lambda: ('/api/articles/?page=5', None),
+            'article-list-cursor': lambda: ('/api/articles/?pagination=cursor', None),
+            'article-filter-category': lambda: (f'/api/articles/?category__slug={category.slug}', None),
+            'article-search': lambda: ('/api/articles/?search=escalade', None),
+            'article-detail': lambda: (f'/api/articles/{rng.choice(slugs)}/', None),
+            'comment-list': lambda: (f'/api/articles/{rng.choice(slugs)}/comments/', None),
+            'category-list': lambda: ('/api/categories/', None),
+            'tag-list': lambda: ('/api/tags/', None),
+        }
+        if token:
+            mix['article-list-auth'] = lambda: ('/api/articles/', token)
+            mix['me'] = lambda: ('/api/me/', token)
+        return mix
+
+    def run_mix(self, options):
+        rng = random.Random(options['seed'])
+        mix = self.build_mix(rng)
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(mix)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            mix = {name: mix[name] for name in options['endpoints']}
+
+        client = Client()
+        results = {}
+        total_requests = 0
+        total_elapsed = 0.0
+        for name, make_request in mix.items():
+            for _ in range(options['warmup']):
+                self.send(client, make_request, options['cold'])
+
+            timings = []
+            query_counts = []
+            query_times = []
+            for _ in range(options['requests']):
+                with QueryRecorder() as recorder:
+                    start = time.perf_counter()
+                    status = self.send(client, make_request, options['cold'])
+                    timings.append((time.perf_counter() - start) * 1000)
+                if status >= 400:
+                    raise CommandError(f'{name} returned HTTP {status}')
+                query_counts.append(recorder.count)
+                query_times.append(recorder.duration * 1000)
+
+            elapsed = sum(timings) / 1000
+            total_requests += len(timings)
+            total_elapsed += elapsed
+            results[name] = {
+                **summarize(timings),
+                'throughput_rps': round(len(timings) / elapsed, 1) if elapsed else None,
+                'queries_mean': round(sum(query_counts) / len(query_counts), 2),
+                'queries_max': max(query_counts),
+                'sql_ms_mean': round(sum(query_times) / len(query_times), 3),
+            }
+            self.stdout.write(self.format_row(name, results[name]))
+
+        return {
+            'endpoints': results,
+            'total_requests': total_requests,
+            'throughput_rps': round(total_requests / total_elapsed, 1) if total_elapsed else None,
+        }
+
+    def send(self, client, make_request, cold):
+        if cold:
+            cache.clear()
+        url, token = make_request()
+        headers = {'HTTP_AUTHORIZATION': token} if token else {}
+        return client.get(url, **headers).status_code
+
+    def format_row(self, name, row):
+        return (
+            f"{name:<26} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+            f"p99 {row['p99_ms']:>8.2f}ms  {row['throughput_rps']:>8.1f} req/s  "
+            f"{row['queries_mean']:>5.1f} queries  {row['sql_ms_mean']:>7.2f}ms SQL"
+        )
+
+    def write_results(self, results, options):
+        now = timezone.now()
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' / f"api-{now:%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'created_at': now.isoformat(),
+            'options': {
+                key: options[key]
+                for key in ('articles', 'comments_per_article', 'requests', 'warmup', 'seed', 'existing_db', 'cold')
+            },
+            **results,
+        }
+        output.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['total_requests']} requests, {results['throughput_rps']} req/s overall. Results written to {output}"
+        ))
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apps.articles.models import Article
+from apps.core.benchmark import benchmark_database, summarize
+
+# wsgi: sync viewsets through the WSGI handler
+# asgi-sync: the same viewsets through the ASGI handler (sync thread adapter)
+# asgi: the async views under /api/async/ through the ASGI handler
+MODES = ('wsgi', 'asgi-sync', 'asgi')
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI and ASGI throughput of the read endpoints under concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=1000, help='Articles to seed in the benchmark database')
+        parser.add_argument('--comments-per-article', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per endpoint, mode and concurrency')
+        parser.add_argument(
+            '--concurrency', type=int, action='append',
+            help='Concurrent connections, can be repeated (default: 1, 16 and 64)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and request order')
+        parser.add_argument(
+            '--existing-db', action='store_true',
+            help='Run against the configured database instead of a freshly seeded test database',
+        )
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Only run these endpoints')
+        parser.add_argument(
+            '--output', default=None,
+            help='JSON results file (default: bench_results/asgi-<timestamp>.json)',
+        )
+
+    def handle(self, *args, **options):
+        options['concurrency'] = options['concurrency'] or [1, 16, 64]
+        with benchmark_database(
+            options['articles'], options['comments_per_article'], options['seed'], options['existing_db']
+        ):
+            # The async views do not use the response cache, neither do the
+            # sync ones here, so both paths do the same database work
+            caches = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+            with override_settings(CACHES=caches, ALLOWED_HOSTS=['*']):
+                results = self.run(options)
+        self.write_results(results, options)
+
+    def build_endpoints(self, rng):
+        slugs = list(
+            Article.objects.filter(status='published', comments_count__gt=0).values_list('slug', flat=True)[:500]
+        )
+        if not slugs:
+            raise CommandError('No published article with comments to benchmark, seed the database first.')
+        # Paths relative to /api/ (sync) and /api/async/ (async)
+        endpoints = {
+            'article-list': lambda: 'articles/',
+            'article-list-cursor': lambda: 'articles/?pagination=cursor',
+            'article-search': lambda: 'articles/?search=escalade',
+            'article-detail': lambda: f'articles/{rng.choice(slugs)}/',
+            'comment-list': lambda: f'articles/{rng.choice(slugs)}/comments/',
+            'category-list': lambda: 'categories/',
+            'tag-list': lambda: 'tags/',
+        }
+        return endpoints
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        endpoints = self.build_endpoints(rng)
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(endpoints)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            endpoints = {name: endpoints[name] for name in options['endpoints']}
+
+        results = {}
+        for name, make_path in endpoints.items():
+            results[name] = {}
+            paths = [make_path() for _ in range(options['requests'])]
+            for mode in MODES:
+                prefix = '/api/async/' if mode == 'asgi' else '/api/'
+                urls = [prefix + path for path in paths]
+                # Warm up connections, imports and the search index check
+                self.send_all(mode, urls[:10], 1)
+                for concurrency in options['concurrency']:
+                    timings, elapsed = self.send_all(mode, urls, concurrency)
+                    row = {
+                        **summarize(timings),
+                        'throughput_rps': round(len(timings) / elapsed, 1) if elapsed else None,
+                    }
+                    results[name].setdefault(mode, {})[concurrency] = row
+                    self.stdout.write(self.format_row(name, mode, concurrency, row))
+        return results
+
+    def send_all(self, mode, urls, concurrency):
+        if mode == 'wsgi':
+            return self.send_wsgi(urls, concurrency)
+        return asyncio.run(self.send_asgi(urls, concurrency))
+
+    def send_wsgi(self, urls, concurrency):
+        local = threading.local()
+
+        def send(url):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            start = time.perf_counter()
+            status = local.client.get(url).status_code
+            return (time.perf_counter() - start) * 1000, url, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            responses = list(pool.map(send, urls))
+        return self.check_responses(responses), time.perf_counter() - start
+
+    async def send_asgi(self, urls, concurrency):
+        client = AsyncClient()
+        pending = iter(urls)
+        responses = []
+
+        async def connection():
+            # Each simulated connection sends its requests one after the other
+            for url in pending:
+                start = time.perf_counter()
+                response = await client.get(url)
+                responses.append(((time.perf_counter() - start) * 1000, url, response.status_code))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(concurrency)))
+        return self.check_responses(responses), time.perf_counter() - start
+
+    def check_responses(self, responses):
+        for _, url, status in responses:
+            if status >= 400:
+                raise CommandError(f'{url} returned HTTP {status}')
+        return [duration for duration, _, _ in responses]
+
+    def format_row(self, name, mode, concurrency, row):
+        return (
+            f"{name:<20} {mode:<9} x{concurrency:<4} {row['throughput_rps']:>8.1f} req/s  "
+            f"p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  p99 {row['p99_ms']:>8.2f}ms"
+        )
+
+    def write_results(self, results, options):
+        now = timezone.now()
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' / f"asgi-{now:%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'created_at': now.isoformat(),
+            'options': {
+                key: options[key]
+                for key in ('articles', 'comments_per_article', 'requests', 'concurrency', 'seed', 'existing_db')
+            },
+            'endpoints': results,
+        }
+        output.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
@@ -0,0 +1,193 @@
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from apps.articles.models import Article, Comment
+from apps.core.benchmark import summarize
+from apps.core.sqlite import pragma_statements
+
+# (pragmas, BEGIN statement) of each configuration
+CONFIGURATIONS = {
+    # What Django does without SQLITE_PRAGMAS and transaction_mode: rollback
+    # journal, synchronous=FULL, 5s sqlite3 timeout, deferred transactions
+    'defaults': ({'journal_mode': 'delete'}, 'BEGIN'),
+    'tuned': (None, 'BEGIN IMMEDIATE'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent readers (article list, comments) and writers (comment creation) against '
+        'copies of the database, with SQLite defaults then with SQLITE_PRAGMAS, and compare '
+        'throughput and "database is locked" errors'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reading threads')
+        parser.add_argument('--writers', type=int, default=4, help='Writing threads')
+        parser.add_argument('--duration', type=float, default=5, help='Seconds per configuration')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', default=None,
+            help='JSON results file (default: bench_results/sqlite-<timestamp>.json)',
+        )
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('bench_sqlite only runs on SQLite.')
+        self.article_ids = list(
+            Article.objects.filter(status='published').values_list('pk', flat=True)[:5000]
+        )
+        self.author_ids = list(Comment.objects.values_list('author_id', flat=True).distinct()[:500])
+        if not self.article_ids or not self.author_ids:
+            raise CommandError('No published article with comments found, run `manage.py seed` first.')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, (pragmas, begin) in CONFIGURATIONS.items():
+                path = Path(directory) / f'{name}.sqlite3'
+                self.copy_database(database['NAME'], path)
+                statements = pragma_statements(settings.SQLITE_PRAGMAS if pragmas is None else pragmas)
+                results[name] = self.run(path, statements, begin, options)
+                self.report(name, results[name])
+        self.write_results(results, options)
+
+    def copy_database(self, source_path, path):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def connect(self, path, statements):
+        # Django's connection parameters: autocommit, 5s default timeout
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        for statement in statements:
+            connection.execute(statement)
+        return connection
+
+    def run(self, path, statements, begin, options):
+        # The journal mode is stored in the file, set it before the threads start
+        self.connect(path, statements).close()
+        stop = threading.Event()
+        stats = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+
+        def worker(kind, seed):
+            rng = random.Random(seed)
+            connection = self.connect(path, statements)
+            operation = self.read if kind == 'read' else partial(self.write, begin=begin)
+            timings = []
+            errors = 0
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        operation(connection, rng)
+                    except sqlite3.OperationalError as exc:
+                        if 'locked' not in str(exc) and 'busy' not in str(exc):
+                            raise
+                        if connection.in_transaction:
+                            connection.execute('ROLLBACK')
+                        errors += 1
+                    else:
+                        timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close()
+            with lock:
+                stats[kind] += timings
+                stats[f'{kind}_errors'] += errors
+
+        threads = [
+            threading.Thread(target=worker, args=('read', options['seed'] * 1000 + index))
+            for index in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=('write', options['seed'] * 1000 + 500 + index))
+            for index in range(options['writers'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        result = {}
+        for kind in ('read', 'write'):
+            attempts = len(stats[kind]) + stats[f'{kind}_errors']
+            result[kind] = {
+                **summarize(stats[kind]),
+                'per_second': round(len(stats[kind]) / elapsed, 1),
+                'locked_errors': stats[f'{kind}_errors'],
+                'locked_rate': round(stats[f'{kind}_errors'] / attempts, 4) if attempts else None,
+            }
+        return result
+
+    def read(self, connection, rng):
+        """A page of the article list with its count, then the comments of one article."""
+        article = Article._meta.db_table
+        connection.execute(
+            f"SELECT id, title, slug, excerpt, published_at FROM {article} WHERE status = 'published' "
+            f"ORDER BY published_at DESC, id DESC LIMIT 10 OFFSET ?",
+            (rng.randrange(0, 500) * 10,),
+        ).fetchall()
+        connection.execute(f"SELECT COUNT(*) FROM {article} WHERE status = 'published'").fetchone()
+        connection.execute(
+            f'SELECT id, author_id, parent_id, content, created_at FROM {Comment._meta.db_table} '
+            f'WHERE article_id = ? ORDER BY created_at DESC LIMIT 10',
+            (rng.choice(self.article_ids),),
+        ).fetchall()
+
+    def write(self, connection, rng, begin):
+        """A comment posted in a transaction that reads before it writes, like the ORM does."""
+        article_id = rng.choice(self.article_ids)
+        now = timezone.now().isoformat()
+        connection.execute(begin)
+        connection.execute(f'SELECT id FROM {Article._meta.db_table} WHERE id = ?', (article_id,)).fetchone()
+        connection.execute(
+            f'INSERT INTO {Comment._meta.db_table} (article_id, author_id, parent_id, content, created_at, updated_at) '
+            f'VALUES (?, ?, NULL, ?, ?, ?)',
+            (article_id, rng.choice(self.author_ids), 'Commentaire de benchmark', now, now),
+        )
+        connection.execute(
+            f'UPDATE {Article._meta.db_table} SET comments_count = comments_count + 1 WHERE id = ?',
+            (article_id,),
+        )
+        connection.execute('COMMIT')
+
+    def report(self, name, result):
+        for kind in ('read', 'write'):
+            row = result[kind]
+            p95 = f"{row['p95_ms']:>8.2f}ms" if row['p95_ms'] is not None else f"{'-':>10}"
+            self.stdout.write(
+                f"{name:<9} {kind:<6} {row['per_second']:>9.1f} ops/s  p95 {p95}  "
+                f"locked {row['locked_errors']:>5} ({(row['locked_rate'] or 0) * 100:.1f}%)"
+            )
+
+    def write_results(self, results, options):
+        now = timezone.now()
+        output = Path(options['output'] or settings.BASE_DIR / 'bench_results' / f"sqlite-{now:%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'created_at': now.isoformat(),
+            'options': {key: options[key] for key in ('readers', 'writers', 'duration', 'seed')},
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'configurations': results,
+        }
+        output.write_text(json.dumps(payload, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.core.replicas import get_config
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database to the SQLite read replicas (DATABASE_REPLICAS), '
+        'once or every --interval seconds'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between copies, run until stopped')
+
+    def handle(self, *args, **options):
+        aliases = get_config()['ALIASES']
+        if not aliases:
+            raise CommandError('No read replica configured, set DATABASE_REPLICAS (e.g. db-replica.sqlite3).')
+        databases = [settings.DATABASES[alias] for alias in [DEFAULT_DB_ALIAS, *aliases]]
+        if any(database['ENGINE'] != 'django.db.backends.sqlite3' for database in databases):
+            raise CommandError('sync_replica only copies SQLite databases.')
+
+        while True:
+            for alias in aliases:
+                self.copy(alias)
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, alias):
+        """
+        Online backup of the primary into a temporary file, then an atomic
+        rename so readers of the replica never see a partial copy. The file
+        mtime is set to when the copy started, which is how fresh the replica
+        is for the router.
+        """
+        primary = str(settings.DATABASES[DEFAULT_DB_ALIAS]['NAME'])
+        replica = str(settings.DATABASES[alias]['NAME'])
+        partial = f'{replica}.partial'
+        started_at = time.time()
+        start = time.perf_counter()
+        source = sqlite3.connect(primary)
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(target)
+            # A WAL file left next to a replaced replica would be replayed on
+            # the new copy, replicas use a rollback journal
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        os.utime(partial, (started_at, started_at))
+        os.replace(partial, replica)
+        self.stdout.write(f'{alias}: {replica} copied in {(time.perf_counter() - start) * 1000:.0f}ms')
@@ -0,0 +1,167 @@
+import heapq
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .replicas import finish_request, get_config, start_request
+
+logger = logging.getLogger('apps.core.performance')
+
+
+class RequestTiming:
+    """Timings collected for a single request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.view_end = None
+        self.queries = []
+        self.db_duration = 0.0
+        self.view_db_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append((duration, sql))
+            self.db_duration += duration
+            if self.view_start is not None and self.view_end is None:
+                self.view_db_duration += duration
+
+
+class PerformanceMiddleware:
+    """
+    Per-request instrumentation exposed as Server-Timing headers.
+
+    Records SQL count and time through connection execute wrappers, the
+    view time, the part of it not spent in SQL (serialization) and the
+    rendering time. Requests slower than SLOW_REQUEST_MS are logged with
+    their most expensive statements. When disabled the middleware removes
+    itself from the stack at startup, so it costs nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'PERFORMANCE_MONITORING', {})
+        if not config.get('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = config.get('SLOW_REQUEST_MS', 500)
+        self.top_queries = config.get('TOP_QUERIES', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = request.performance_timing = RequestTiming()
+        with self.wrap_connections(timing):
+            response = self.get_response(request)
+        return self.add_timings(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = request.performance_timing = RequestTiming()
+        # Connections are per thread: wrap the ones of the thread that runs
+        # this request's sync_to_async calls, where the ORM queries happen
+        stack = await sync_to_async(self.wrap_connections)(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.add_timings(request, response, timing)
+
+    def wrap_connections(self, timing):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timing))
+        return stack
+
+    def add_timings(self, request, response, timing):
+        end = time.perf_counter()
+        if timing.view_start is not None and timing.view_end is None:
+            timing.view_end = end
+
+        metrics = self.get_metrics(timing, end)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration:.1f}' + (f';desc="{desc}"' if desc else '')
+            for name, duration, desc in metrics
+        )
+        total_ms = (end - timing.start) * 1000
+        if total_ms >= self.slow_request_ms:
+            self.log_slow_request(request, response, timing, total_ms)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance_timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, the view is done here
+        request.performance_timing.view_end = time.perf_counter()
+        return response
+
+    def get_metrics(self, timing, end):
+        metrics = [('db', timing.db_duration * 1000, f'{len(timing.queries)} queries')]
+        if timing.view_start is not None:
+            view = timing.view_end - timing.view_start
+            metrics += [
+                ('view', view * 1000, None),
+                ('serialize', max(0.0, view - timing.view_db_duration) * 1000, 'view time outside SQL'),
+                ('render', (end - timing.view_end) * 1000, None),
+            ]
+        metrics.append(('total', (end - timing.start) * 1000, None))
+        return metrics
+
+    def log_slow_request(self, request, response, timing, total_ms):
+        top = heapq.nlargest(self.top_queries, timing.queries, key=lambda query: query[0])
+        lines = [f'  {duration * 1000:8.1f}ms  {sql[:500]}' for duration, sql in top]
+        logger.warning(
+            'Slow request %s %s -> %s in %.0fms (%d queries, %.0fms SQL)\n%s',
+            request.method, request.get_full_path(), response.status_code, total_ms,
+            len(timing.queries), timing.db_duration * 1000, '\n'.join(lines),
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets PrimaryReplicaRouter send the reads of safe-method requests to the
+    read replicas, and pins users who just wrote to the primary. Removed
+    from the stack at startup when no replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_config()
+        if not config['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.aliases = config['ALIASES']
+        self.pin_seconds = config['PIN_SECONDS']
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = start_request(request, self.aliases)
+        response = self.get_response(request)
+        finish_request(request, response, routing, self.pin_seconds)
+        return response
+
+    async def __acall__(self, request):
+        # The routing state is a context variable, sync_to_async calls see it
+        routing = start_request(request, self.aliases)
+        response = await self.get_response(request)
+        finish_request(request, response, routing, self.pin_seconds)
+        return response
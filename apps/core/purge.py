@@ -0,0 +1,71 @@
+"""
+Set-based deletion of a queryset and of everything that cascades from it.
+
+QuerySet.delete() goes through Django's Collector, which loads every
+cascaded row (each reply of each comment, each tag link...) to send the
+delete signals. purge() instead walks the relations of the models and runs
+one DELETE ... WHERE fk IN (subquery) per relation, children first, in one
+transaction: no row is loaded and no signal is sent, callers redo what
+their receivers would have done. Cascades of a model onto itself (comment
+replies) are expanded with a recursive CTE.
+"""
+
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import CASCADE, DO_NOTHING, SET_NULL
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.expressions import RawSQL
+
+
+def purge(queryset):
+    """Delete `queryset` and its cascades without signals, returns {model label: rows deleted}."""
+    using = router.db_for_write(queryset.model)
+    counts = Counter()
+    with transaction.atomic(using=using):
+        _purge(queryset.using(using).order_by(), counts, ())
+    return dict(counts)
+
+
+def with_descendants(queryset):
+    """`queryset` and the rows below it through the model's self-referencing CASCADE keys."""
+    model = queryset.model
+    parents = [
+        field for field in model._meta.concrete_fields
+        if field.remote_field and field.remote_field.model is model
+        and field.remote_field.on_delete is CASCADE
+    ]
+    if not parents:
+        return queryset
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    roots, params = queryset.order_by().values('pk').query.get_compiler(queryset.db).as_sql()
+    on = ' OR '.join(f'child.{quote(field.column)} = tree.id' for field in parents)
+    sql = (
+        f'WITH RECURSIVE tree(id) AS ({roots} UNION '
+        f'SELECT child.{quote(model._meta.pk.column)} FROM {quote(model._meta.db_table)} child '
+        f'JOIN tree ON {on}) SELECT id FROM tree'
+    )
+    return model._base_manager.using(queryset.db).filter(pk__in=RawSQL(sql, params))
+
+
+def _purge(queryset, counts, path):
+    model = queryset.model
+    if model in path:
+        raise ValueError(f'purge() does not handle the cascade cycle through {model._meta.label}.')
+    queryset = with_descendants(queryset)
+    for relation in get_candidate_relations_to_delete(model._meta):
+        field = relation.field
+        on_delete = field.remote_field.on_delete
+        if on_delete is DO_NOTHING or (relation.related_model is model and on_delete is CASCADE):
+            # Rows below are in `queryset` already
+            continue
+        related = relation.related_model._base_manager.using(queryset.db).filter(**{f'{field.name}__in': queryset})
+        if on_delete is CASCADE:
+            _purge(related, counts, (*path, model))
+        elif on_delete is SET_NULL:
+            related.update(**{field.name: None})
+        else:
+            raise ValueError(f'purge() does not handle on_delete={on_delete.__name__} of {field}.')
+    # What QuerySet.delete() runs when there is nothing to collect
+    counts[model._meta.label] += queryset._raw_delete(queryset.db)
@@ -0,0 +1,151 @@
+"""
+Read replica routing.
+
+Safe-method requests read from the replicas listed in READ_REPLICAS, every
+other read and all writes go to `default`. A request that writes switches
+to the primary for the rest of its reads, and the writing user stays on the
+primary until a replica has caught up with the write (SQLite replicas: the
+copy is newer than the write), at most PIN_SECONDS. Pins are kept in the
+default cache, which must be shared by the workers in production like the
+response cache generation.
+"""
+
+import os
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+
+_routing = ContextVar('read_routing', default=None)
+
+
+def get_config():
+    config = getattr(settings, 'READ_REPLICAS', {})
+    return {
+        'ALIASES': [alias for alias in config.get('ALIASES', ()) if alias in settings.DATABASES],
+        'PIN_SECONDS': config.get('PIN_SECONDS', 10),
+    }
+
+
+def pin_key(user_id):
+    return f'replicas:pin:{user_id}'
+
+
+def pin_user(user_id, pin_seconds):
+    """Keep the user's reads on the primary until the replicas have caught up."""
+    cache.set(pin_key(user_id), time.time(), pin_seconds)
+
+
+def replica_synced_at(alias):
+    """
+    When the replica last caught up with the primary, 0 when unknown. For
+    SQLite copies made by `manage.py sync_replica` it is the file's mtime.
+    """
+    database = settings.DATABASES[alias]
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        return 0
+    try:
+        return os.path.getmtime(database['NAME'])
+    except OSError:
+        return 0
+
+
+def authenticated_user(request):
+    """
+    The request's authenticated user if it is already known: the one DRF
+    stores on the Django request, or an evaluated lazy user. Never evaluates
+    the lazy user of AuthenticationMiddleware, whose session read would come
+    back through the router.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, LazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+class ReadRouting:
+    """Where the reads of the current request go."""
+
+    def __init__(self, request, replicas):
+        self.request = request
+        # Replicas the reads can use, none means the primary
+        self.replicas = list(replicas)
+        self.user_checked = False
+        self.wrote = False
+
+    def check_user_pin(self):
+        """Drop the replicas that are behind the user's last write, once the user is known."""
+        if self.user_checked:
+            return
+        user = authenticated_user(self.request)
+        if user is None:
+            return
+        self.user_checked = True
+        wrote_at = cache.get(pin_key(user.pk))
+        if wrote_at is not None:
+            self.replicas = [alias for alias in self.replicas if replica_synced_at(alias) > wrote_at]
+
+
+def start_request(request, aliases):
+    """Routing state of a request, reads of unsafe methods stay on the primary."""
+    routing = ReadRouting(request, aliases if request.method in ('GET', 'HEAD', 'OPTIONS') else ())
+    _routing.set(routing)
+    return routing
+
+
+def read_from_primary():
+    """Send the remaining reads of the current request to the primary."""
+    routing = _routing.get()
+    if routing is not None:
+        routing.replicas = []
+
+
+def finish_request(request, response, routing, pin_seconds):
+    user = authenticated_user(request)
+    if routing.wrote and user is not None:
+        pin_user(user.pk, pin_seconds)
+    # A streaming body is read after the middleware returns, keep its routing
+    if not response.streaming:
+        _routing.set(None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes, migrations and reads outside requests go to `default`. Reads of
+    safe-method requests go to a random replica that is fresh enough for the
+    user, see ReplicaRoutingMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.replicas:
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction must see its writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        routing.check_user_pin()
+        if not routing.replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(routing.replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            # The rest of the request reads its own writes
+            routing.wrote = True
+            routing.replicas = []
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, migrated with it
+        return db == DEFAULT_DB_ALIAS
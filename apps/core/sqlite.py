@@ -0,0 +1,49 @@
+"""
+SQLite connection tuning.
+
+Every new SQLite connection gets the pragmas of settings.SQLITE_PRAGMAS
+(WAL journal, busy timeout, cache and mmap sizes...). They are applied by a
+connection_created receiver, so persistent connections (CONN_MAX_AGE) pay
+for them once. `manage.py bench_sqlite` measures their effect.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Pragmas whose value is a keyword, the others must be integers
+KEYWORD_PRAGMAS = {
+    'journal_mode': {'delete', 'truncate', 'persist', 'memory', 'wal', 'off'},
+    'synchronous': {'off', 'normal', 'full', 'extra'},
+    'temp_store': {'default', 'file', 'memory'},
+}
+
+
+def pragma_statements(pragmas):
+    """PRAGMA statements for `pragmas`, validated since they cannot be parameters."""
+    statements = []
+    for name, value in pragmas.items():
+        if name in KEYWORD_PRAGMAS:
+            value = str(value).lower()
+            if value not in KEYWORD_PRAGMAS[name]:
+                raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+        elif isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f'PRAGMA {name} expects an integer, got {value!r}')
+        if not name.isidentifier():
+            raise ValueError(f'Invalid PRAGMA name: {name!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """connection_created receiver."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if connection.alias != DEFAULT_DB_ALIAS:
+        # The journal mode is stored in the file: read replicas keep the
+        # one `sync_replica` gives their copy, never a WAL next to a file
+        # that gets replaced
+        pragmas.pop('journal_mode', None)
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
@@ -0,0 +1,62 @@
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+user_cache = caches['users']
+
+
+def user_cache_key(user_id):
+    return f'users:auth:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    user_cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication resolving users from the `users` cache.
+
+    The user is stored with its profile, so authenticated requests that only
+    need `request.user` (and `request.user.profile`) run no auth query. The
+    cache hands out a fresh copy on every read, so nothing a view does to
+    `request.user` leaks into other requests. Entries are dropped by the
+    users signals when a User or Profile is saved or deleted, and expire
+    after the cache TIMEOUT otherwise. The active and revoke checks still run
+    against the cached user on every request.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        key = user_cache_key(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            # From the primary, a lagging replica must not be cached
+            user = (
+                self.user_model.objects.using(DEFAULT_DB_ALIAS)
+                .select_related('profile')
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .first()
+            )
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(key, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
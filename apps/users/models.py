@@ -2,9 +2,25 @@ from django.contrib.auth.models import User
 from django.db import models
 
 
+class ProfileManager(models.Manager):
+    def create_for_users(self, users, batch_size=None):
+        """
+        Create the profiles of users inserted with bulk_create, which skips
+        the post_save signal. Users that already have a profile are ignored.
+        """
+        return self.bulk_create(
+            [self.model(user=user) for user in users],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+
 class Profile(models.Model):
     """Extended user profile."""
 
+    # Fields compared by save_if_dirty()
+    TRACKED_FIELDS = ('bio', 'avatar_url', 'website')
+
     user = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
@@ -16,9 +32,53 @@ class Profile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProfileManager()
+
     class Meta:
         verbose_name = 'Profil'
         verbose_name_plural = 'Profils'
 
     def __str__(self):
         return f"Profil de {self.user.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = {}
+        instance._snapshot(cls.TRACKED_FIELDS)
+        return instance
+
+    def _snapshot(self, fields):
+        for name in fields:
+            # Deferred fields are not in __dict__ and stay out of the snapshot
+            if name in self.TRACKED_FIELDS and name in self.__dict__:
+                self._saved_values[name] = self.__dict__[name]
+
+    def get_dirty_fields(self):
+        """Tracked fields changed since the profile was loaded or saved."""
+        saved = getattr(self, '_saved_values', {})
+        return [
+            name for name in self.TRACKED_FIELDS
+            if name in self.__dict__ and (name not in saved or saved[name] != self.__dict__[name])
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not hasattr(self, '_saved_values'):
+            self._saved_values = {}
+        update_fields = kwargs.get('update_fields')
+        self._snapshot(self.TRACKED_FIELDS if update_fields is None else update_fields)
+
+    def save_if_dirty(self):
+        """
+        Write only the changed fields (and updated_at). Returns False without
+        touching the database when nothing changed.
+        """
+        if self._state.adding:
+            self.save()
+            return True
+        dirty = self.get_dirty_fields()
+        if not dirty:
+            return False
+        self.save(update_fields=[*dirty, 'updated_at'])
+        return True
@@ -45,15 +45,16 @@ class MeSerializer(serializers.ModelSerializer):
         profile_data = validated_data.pop('profile', {})
 
         # Update user fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        if validated_data:
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save(update_fields=list(validated_data))
 
-        # Update profile fields
+        # Update profile fields, only the changed ones are written
         if profile_data:
             profile = instance.profile
             for attr, value in profile_data.items():
                 setattr(profile, attr, value)
-            profile.save()
+            profile.save_if_dirty()
 
         return instance
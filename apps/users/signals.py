@@ -1,7 +1,8 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .authentication import invalidate_cached_user
 from .models import Profile
 
 
@@ -14,6 +15,23 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    """Save the Profile when the User is saved."""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+    """Persist pending changes of the Profile loaded with the User, if any."""
+    # Only a profile already attached to the instance can have pending
+    # changes, so never load one here (last_login updates, bulk scripts...)
+    profile = User.profile.related.get_cached_value(instance, default=None)
+    if profile is not None:
+        profile.save_if_dirty()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_cache(sender, instance, **kwargs):
+    """Drop the cached authentication user (is_active, is_staff, password...)."""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_auth_cache(sender, instance, **kwargs):
+    """The cached authentication user carries its profile."""
+    invalidate_cached_user(instance.user_id)
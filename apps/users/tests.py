@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.tokens import AccessToken
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class WriteCountTests(TestCase):
+    """Logins and profile updates only write what changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('grimpeuse', password='grimpe-grimpe', first_name='Lucie')
+
+    def setUp(self):
+        # Authenticated users are cached
+        for cache in caches.all():
+            cache.clear()
+
+    def writes(self, action):
+        """(statement, table) of the writes run by `action`."""
+        with CaptureQueriesContext(connection) as queries:
+            action()
+        writes = []
+        for query in queries.captured_queries:
+            words = query['sql'].replace('"', '').split()
+            if words[0] in WRITE_STATEMENTS:
+                # INSERT INTO t, UPDATE t, DELETE FROM t
+                writes.append((words[0], words[1] if words[0] == 'UPDATE' else words[2]))
+        return writes
+
+    def login(self):
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'grimpeuse', 'password': 'grimpe-grimpe'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def patch_me(self, data):
+        response = self.client.patch(
+            '/api/me/', data, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}',
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_user(self):
+        writes = self.writes(lambda: User.objects.create_user('alpiniste', password='grimpe-grimpe'))
+        self.assertEqual(writes, [('INSERT', 'auth_user'), ('INSERT', 'users_profile')])
+
+    def test_login(self):
+        self.assertEqual(self.writes(self.login), [])
+
+    def test_login_updating_last_login(self):
+        # The simplejwt serializers keep the settings object they imported
+        with mock.patch.object(jwt_serializers.api_settings, 'UPDATE_LAST_LOGIN', True):
+            writes = self.writes(self.login)
+        # last_login only, the profile is not written
+        self.assertEqual(writes, [('UPDATE', 'auth_user')])
+
+    def test_patch_profile(self):
+        self.assertEqual(self.writes(lambda: self.patch_me({'profile': {'bio': 'Bloc et voie'}})), [
+            ('UPDATE', 'users_profile'),
+        ])
+        # Same values again: nothing to write
+        self.assertEqual(self.writes(lambda: self.patch_me({'profile': {'bio': 'Bloc et voie'}})), [])
+
+    def test_patch_profile_writes_changed_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.patch_me({'first_name': 'Lucie', 'profile': {'website': 'https://example.com'}})
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        user_update, profile_update = updates
+        self.assertIn('"first_name"', user_update)
+        self.assertNotIn('"password"', user_update)
+        self.assertIn('"website"', profile_update)
+        self.assertNotIn('"bio"', profile_update)
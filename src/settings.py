@@ -2,6 +2,8 @@
 Django settings for Summit blog project.
 """
 
+import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -11,6 +13,10 @@ SECRET_KEY = 'django-insecure-dev-key-change-in-production'
 
 DEBUG = True
 
+# `manage.py test`: background threads are off, work runs in the test
+# transaction, and requests are not timed
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
 # Application definition
@@ -27,12 +33,15 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     # Local apps
+    'apps.core',
     'apps.users',
     'apps.articles',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Before anything that reads the database
+    'apps.core.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,6 +49,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Last so its timings wrap the view only
+    'apps.core.middleware.PerformanceMiddleware',
 ]
 
 ROOT_URLCONF = 'src.urls'
@@ -66,7 +77,118 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections, the pragmas below are applied once per connection
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Transactions take the write lock when they start: two of them can
+            # no longer both read then fail to upgrade with "database is locked"
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Applied to every new SQLite connection (apps.core.sqlite), measure with
+# `manage.py bench_sqlite`
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer and the writer no longer blocks readers
+    'journal_mode': 'wal',
+    # Safe with WAL: a power loss can lose the last commits, never corrupt
+    'synchronous': 'normal',
+    # Milliseconds a writer waits for the lock before "database is locked"
+    'busy_timeout': 5000,
+    # Page cache per connection, negative values are KiB (64 MiB)
+    'cache_size': -65536,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Read replicas. Locally they are SQLite copies of db.sqlite3 refreshed by
+# `manage.py sync_replica`: DATABASE_REPLICAS=db-replica.sqlite3 (comma
+# separated for several)
+for index, name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / name.strip(),
+        # sync_replica replaces the file, a new connection per request sees the new copy
+        'CONN_MAX_AGE': 0,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['apps.core.replicas.PrimaryReplicaRouter']
+
+READ_REPLICAS = {
+    # Aliases of DATABASES serving the reads of GET requests
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    # After a write, the user reads from the primary until a replica is newer
+    # than the write, at most this long
+    'PIN_SECONDS': 10,
+}
+
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'summit',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Users resolved from JWT access tokens (apps.users.authentication). Kept
+    # in process on purpose: the TTL bounds how long another worker can serve
+    # a user that was changed elsewhere.
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'summit-users',
+        'TIMEOUT': 60,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # slug -> (id, status, author_id) of articles, for the nested comment
+    # routes (apps.articles.cache.resolve_article). In process like `users`.
+    'articles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'summit-articles',
+        'TIMEOUT': 60,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Lifetime of cached anonymous API responses, writes invalidate them earlier.
+# The generation bumped by writes lives in the `default` cache: with several
+# workers on LocMemCache, another worker can serve a stale response, ETag or
+# Last-Modified for this long at most (a shared backend makes it immediate).
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Article view counters (apps.articles.popularity)
+ARTICLE_VIEWS = {
+    # Buffered views are written by a background thread every FLUSH_SECONDS,
+    # or as soon as the buffer holds MAX_PENDING (article, hour) counters;
+    # False writes each view in the request that counts it
+    'BACKGROUND': not TESTING,
+    'FLUSH_SECONDS': 10,
+    'MAX_PENDING': 10000,
+    # Hourly counters older than this are deleted
+    'RETENTION_DAYS': 30,
+    # /api/articles/trending/: default ?days=, and how fast views lose weight
+    'TRENDING_DAYS': 7,
+    'HALF_LIFE_HOURS': 24,
+    'TRENDING_SIZE': 10,
+}
+
+# Related articles (apps.articles.related)
+RELATED_ARTICLES = {
+    # Updates after a tag or status change run in a background thread, off
+    # the request; False runs them on commit, in the request
+    'BACKGROUND': True,
+    # A failed update is retried after this delay
+    'RETRY_SECONDS': 60,
+}
+
+# Per-request instrumentation: Server-Timing headers and slow request log
+PERFORMANCE_MONITORING = {
+    # Off under tests, where password hashing alone makes logins "slow"
+    'ENABLED': not TESTING,
+    'SLOW_REQUEST_MS': 500,
+    # Statements logged with a slow request, most expensive first
+    'TOP_QUERIES': 5,
 }
 
 # Password validation
@@ -98,7 +220,7 @@ CORS_ALLOWED_ORIGINS = [
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -108,7 +230,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.articles.pagination.AsyncPageNumberPagination',
     'PAGE_SIZE': 10,
 }
 